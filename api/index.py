@@ -3,19 +3,90 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth_router, products_router, orders_router, payment_router, admin_router
+from app.services.startup_timing import startup_timer
+
+with startup_timer.phase("import fastapi"):
+    from contextlib import asynccontextmanager
+    from fastapi import FastAPI, Request
+    from fastapi.middleware.cors import CORSMiddleware
+
+with startup_timer.phase("import app.database"):
+    from app.config import settings
+    from app.database import async_engine, replica_async_engine
+
+with startup_timer.phase("import app.routers"):
+    from app.routers import auth_router, products_router, orders_router, payment_router, admin_router
+    from app.services.idempotency import IdempotencyMiddleware
+    from app.services.payment_gateway import close_payment_gateway, get_payment_gateway
+    from app.services.payment_notifier import payment_notifier
+    from app.services.webhook_inbox import webhook_worker
+
+# O schema nao e mais criado no import (cold start): use `python -m app.cli init-db`
+# (migracoes do Alembic, em migrations/).
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_timer.phase("lifespan"):
+        if not settings.SERVERLESS:
+            # Servidor de vida longa: ja abre o cliente do MP. Em serverless ele
+            # fica para o primeiro pagamento, fora do cold start.
+            get_payment_gateway()
+        if settings.WEBHOOK_WORKER_ENABLED:
+            webhook_worker.start()
+        await payment_notifier.start()
+    startup_timer.log()
+    yield
+    await webhook_worker.stop()
+    await payment_notifier.stop()
+    await close_payment_gateway()
+    await async_engine.dispose()
+    if replica_async_engine is not None:
+        await replica_async_engine.dispose()
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Aprova Facil API",
     description="API para sistema de recuperacao de credito",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Idempotency-Key em POST /api/orders e nos pagamentos (ver app/services/idempotency.py).
+app.add_middleware(IdempotencyMiddleware)
+
+if settings.RATE_LIMIT_ENABLED:
+    # Por fora da idempotencia: o 429 sai antes de qualquer acesso ao banco.
+    from app.services.rate_limit import RateLimitMiddleware
+
+    app.add_middleware(RateLimitMiddleware)
+
+if settings.METRICS_ENABLED:
+    import secrets
+    from fastapi.responses import PlainTextResponse
+    from app.services.metrics import MetricsMiddleware, instrument_engine, render as render_metrics
+
+    instrument_engine(async_engine.sync_engine)
+    if replica_async_engine is not None:
+        instrument_engine(replica_async_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        # Sem METRICS_TOKEN o endpoint nao e exposto, mesmo com METRICS_ENABLED.
+        if not settings.METRICS_TOKEN:
+            return PlainTextResponse("Nao encontrado", status_code=404)
+        if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+            return PlainTextResponse("Nao autorizado", status_code=401)
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+if settings.QUERY_COUNT_HEADER:
+    from app.services.query_counter import QueryCountMiddleware
+
+    app.add_middleware(QueryCountMiddleware)
+
+# CORS por ultimo (mais externo): as respostas dos middlewares acima (429, 409...)
+# tambem levam os headers, e o front consegue ler o Retry-After.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -25,6 +96,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
 app.include_router(auth_router)
@@ -35,10 +107,10 @@ app.include_router(admin_router)
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Aprova Facil API", "version": "1.0.0"}
 
 
 @app.get("/api/health")
-def health_check():
+async def health_check():
     return {"status": "healthy"}
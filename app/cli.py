@@ -0,0 +1,112 @@
+# Comandos de manutencao. Uso:
+#   python -m app.cli init-db          (aplica as migracoes; o mesmo que `alembic upgrade head`)
+#   python -m app.cli startup-report [--top 25]
+#   python -m app.cli purge-idempotency  (apaga Idempotency-Keys expiradas; rodar via cron)
+#   python -m app.cli purge-rate-limits  (apaga baldes parados do rate limit "postgres")
+#   python -m app.cli purge-revoked-tokens  (apaga revogacoes de tokens que ja expiraram)
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def init_db(args):
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import inspect
+    from app.database import engine
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    tables = inspect(engine).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        # Banco criado pelo create_all de antes das migracoes: ja tem o schema inicial
+        # (as tabelas que vieram depois dele sao criadas, se faltarem, pela 0006).
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+    print("Schema atualizado")
+
+
+def purge_idempotency(args):
+    import asyncio
+    from app.services.idempotency import purge_expired
+
+    print(f"{asyncio.run(purge_expired())} chaves expiradas removidas")
+
+
+def purge_rate_limits(args):
+    import asyncio
+    from app.services.rate_limit import purge_idle_buckets
+
+    print(f"{asyncio.run(purge_idle_buckets(args.max_idle_seconds))} baldes removidos")
+
+
+def purge_revoked_tokens(args):
+    import asyncio
+    from app.services.token_revocation import purge_expired
+
+    print(f"{asyncio.run(purge_expired())} revogacoes expiradas removidas")
+
+
+def startup_report(args):
+    # Roda o import do app num processo novo com -X importtime e agrupa o
+    # tempo proprio de cada modulo por pacote.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api.index"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit(result.returncode)
+
+    pattern = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)")
+    self_us = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, module = match.groups()
+        package = module if module.startswith("app.") or module.startswith("api.") else module.split(".")[0]
+        self_us[package] += int(own)
+        if len(indent) == 1:
+            total_us += int(cumulative)
+
+    print(f"{'modulo':<40} {'ms':>8}")
+    for package, own in sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<40} {own / 1000:>8.1f}")
+    print(f"{'total':<40} {total_us / 1000:>8.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help="cria/atualiza o schema (migracoes)").set_defaults(func=init_db)
+
+    commands.add_parser(
+        "purge-idempotency", help="remove Idempotency-Keys expiradas"
+    ).set_defaults(func=purge_idempotency)
+
+    purge = commands.add_parser("purge-rate-limits", help="remove baldes parados do rate limit")
+    purge.add_argument("--max-idle-seconds", type=int, default=86400)
+    purge.set_defaults(func=purge_rate_limits)
+
+    commands.add_parser(
+        "purge-revoked-tokens", help="remove revogacoes de tokens expiradas"
+    ).set_defaults(func=purge_revoked_tokens)
+
+    report = commands.add_parser("startup-report", help="custo de import por modulo no cold start")
+    report.add_argument("--top", type=int, default=25)
+    report.set_defaults(func=startup_report)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
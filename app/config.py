@@ -1,17 +1,69 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict
 import os
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DATABASE_ASYNC_DRIVER: str = "psycopg"
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 30
+    DATABASE_POOL_MODE: str = "auto"
+    DATABASE_EXTERNAL_POOLER: bool = False
+    DATABASE_REPLICA_URL: str = os.getenv("DATABASE_REPLICA_URL", "")
+    DATABASE_REPLICA_STICKY_SECONDS: float = 5.0
+    SERVERLESS: bool = bool(os.getenv("VERCEL"))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "secret")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.01
+    BCRYPT_ROUNDS: int = 12
+    BCRYPT_MAX_WORKERS: int = 4
+    BCRYPT_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: float = 60.0
     MP_ACCESS_TOKEN: str = os.getenv("MP_ACCESS_TOKEN", "")
     MP_PUBLIC_KEY: str = os.getenv("MP_PUBLIC_KEY", "")
+    MP_API_BASE_URL: str = "https://api.mercadopago.com"
+    MP_TIMEOUT_SECONDS: float = 10.0
+    MP_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    MP_MAX_RETRIES: int = 2
+    MP_MAX_CONNECTIONS: int = 50
+    WEBHOOK_WORKER_ENABLED: bool = False
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = 2.0
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_MAX_ATTEMPTS: int = 5
+    WEBHOOK_RETRY_DELAY_SECONDS: int = 30
+    PAYMENT_NOTIFIER_BACKEND: str = "memory"
+    PAYMENT_STREAM_MAX_SECONDS: float = 300.0
+    PAYMENT_STREAM_HEARTBEAT_SECONDS: float = 15.0
+    WEBHOOK_CLAIM_TIMEOUT_SECONDS: int = 120
     APP_NAME: str = "Aprova Facil"
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:8080")
+    CATALOG_CACHE_TTL_SECONDS: int = 60
+    STATS_COUNTERS_ENABLED: bool = False
+    ORDER_BATCH_CHUNK_SIZE: int = 500
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = bool(os.getenv("VERCEL"))
+    # "METODO /path" -> {escopo: "N/periodo"}; escopos: ip, user (token) e email (corpo JSON).
+    RATE_LIMITS: Dict[str, Dict[str, str]] = {
+        "POST /api/auth/login": {"ip": "30/minute", "email": "10/minute"},
+        "POST /api/auth/register": {"ip": "10/minute", "email": "5/minute"},
+        "POST /api/payment/pix": {"user": "10/minute", "ip": "30/minute"},
+        "POST /api/payment/card": {"user": "5/minute", "ip": "20/minute"}
+    }
+    QUERY_COUNT_HEADER: bool = False
+    # /metrics so responde com "Authorization: Bearer <METRICS_TOKEN>"; sem token fica desligado.
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    METRICS_ENABLED: bool = bool(os.getenv("METRICS_TOKEN"))
 
     class Config:
         env_file = ".env"
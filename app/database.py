@@ -1,20 +1,156 @@
-from sqlalchemy import create_engine
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import Delete, Insert, Select, Update, create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from app.config import settings
 
-database_url = settings.DATABASE_URL
-if database_url.startswith("postgresql://"):
-    database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
 
-engine = create_engine(database_url, pool_pre_ping=True, pool_size=5, max_overflow=10)
+def _sync_url(url: str) -> str:
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+database_url = _sync_url(settings.DATABASE_URL)
+replica_url = _sync_url(settings.DATABASE_REPLICA_URL)
+
+
+def _async_url(url: str) -> str:
+    if url.startswith("postgresql+psycopg://") and settings.DATABASE_ASYNC_DRIVER != "psycopg":
+        return url.replace("postgresql+psycopg://", f"postgresql+{settings.DATABASE_ASYNC_DRIVER}://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def _engine_options(url: str, pool_size: int, max_overflow: int) -> dict:
+    # "null": sem pool no processo (uma conexao por uso), o certo para funcoes
+    # serverless de vida curta ou atras de um pooler externo (PgBouncer, Neon).
+    # "auto" escolhe "null" quando roda em serverless e "queue" caso contrario.
+    mode = settings.DATABASE_POOL_MODE
+    if mode == "auto":
+        mode = "null" if settings.SERVERLESS else "queue"
+
+    options = {}
+    if mode == "null":
+        options["poolclass"] = NullPool
+    else:
+        options.update(pool_pre_ping=True, pool_size=pool_size, max_overflow=max_overflow)
+
+    if settings.DATABASE_EXTERNAL_POOLER and url.startswith("postgresql+psycopg://"):
+        # PgBouncer em modo transaction nao suporta prepared statements. Olha a
+        # URL do proprio engine: primario e replica podem usar drivers diferentes.
+        options["connect_args"] = {"prepare_threshold": None}
+    return options
+
+
+# Engine sincrono: DDL, scripts e tarefas fora do ciclo de requisicao.
+engine = create_engine(database_url, **_engine_options(database_url, 5, 10))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine assincrono usado pelos routers; com postgresql+psycopg o SQLAlchemy
+# seleciona o modo async do psycopg 3 automaticamente.
+async_database_url = _async_url(database_url)
+async_engine = create_async_engine(
+    async_database_url,
+    **_engine_options(async_database_url, settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW)
+)
+
+# Replica opcional (DATABASE_REPLICA_URL), so para as rotas de leitura que usam get_read_db.
+async_replica_url = _async_url(replica_url)
+replica_async_engine = create_async_engine(
+    async_replica_url,
+    **_engine_options(async_replica_url, settings.DATABASE_POOL_SIZE, settings.DATABASE_MAX_OVERFLOW)
+) if replica_url else None
+
+# Usuario autenticado da requisicao (preenchido pelo get_current_user) e ate
+# quando cada usuario le do primario depois de escrever. O mapa e por
+# processo: com varios workers, a leitura logo apos a escrita pode cair em
+# outro processo e ir para a replica.
+request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+_primary_until: "OrderedDict[int, float]" = OrderedDict()
+STICKY_MAX_USERS = 100000
+
+
+def _mark_primary(user_id: Optional[int]):
+    if user_id is None or replica_async_engine is None:
+        return
+    _primary_until[user_id] = time.monotonic() + settings.DATABASE_REPLICA_STICKY_SECONDS
+    _primary_until.move_to_end(user_id)
+    while len(_primary_until) > STICKY_MAX_USERS:
+        _primary_until.popitem(last=False)
+
+
+def _reads_from_primary(user_id: Optional[int]) -> bool:
+    if user_id is None:
+        return False
+    until = _primary_until.get(user_id)
+    if until is None:
+        return False
+    if until < time.monotonic():
+        del _primary_until[user_id]
+        return False
+    return True
+
+
+class TrackingSession(Session):
+    pass
+
+
+@event.listens_for(TrackingSession, "after_flush")
+def _flushed(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(TrackingSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(TrackingSession, "after_commit")
+def _committed(session):
+    if session.info.pop("wrote", False):
+        _mark_primary(request_user_id.get())
+
+
+class RoutingSession(TrackingSession):
+    # Leituras vao para a replica; escrita, SELECT ... FOR UPDATE e quem
+    # escreveu ha menos de DATABASE_REPLICA_STICKY_SECONDS ficam no primario
+    # (o usuario le o que acabou de gravar, sem depender do lag da replica).
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self._flushing
+            or self.info.get("wrote")
+            or isinstance(clause, (Insert, Update, Delete))
+            or (isinstance(clause, Select) and clause._for_update_arg is not None)
+            or _reads_from_primary(request_user_id.get())
+        ):
+            return async_engine.sync_engine
+        return replica_async_engine.sync_engine
+
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=TrackingSession, autoflush=False, expire_on_commit=False
+)
+ReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+) if replica_async_engine is not None else AsyncSessionLocal
+
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    # Rotas so de leitura; sem DATABASE_REPLICA_URL e o mesmo que get_db.
+    async with ReadSessionLocal() as db:
         yield db
-    finally:
-        db.close()
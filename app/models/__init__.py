@@ -2,3 +2,8 @@ from app.models.user import User
 from app.models.product import Product
 from app.models.order import Order, OrderItem, OrderStatus
 from app.models.payment import Payment, PaymentStatus, PaymentMethod
+from app.models.stats import StatsCounter
+from app.models.webhook import WebhookEvent, WebhookEventStatus
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
+from app.models.rate_limit import RateLimitBucket
+from app.models.revoked_token import RevokedToken
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy.sql import func
+from app.database import Base
+import enum
+
+
+class IdempotencyStatus(str, enum.Enum):
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # A chave vale por usuario e por endpoint: a mesma chave em outra rota e outra requisicao.
+    user_id = Column(Integer, primary_key=True)
+    endpoint = Column(String(100), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    request_hash = Column(String(64), nullable=False)
+    status = Column(String(20), default=IdempotencyStatus.PROCESSING.value, nullable=False)
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.database import Base
 import enum
@@ -21,6 +21,7 @@ class PaymentMethod(str, enum.Enum):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, unique=True)
@@ -31,7 +32,8 @@ class Payment(Base):
     status = Column(String(20), default=PaymentStatus.PENDING.value)
     amount = Column(Numeric(10, 2), nullable=False)
     pix_qr_code = Column(Text, nullable=True)
-    pix_qr_code_base64 = Column(Text, nullable=True)
+    # Imagem grande (varios KB): so e carregada quando pedida explicitamente.
+    pix_qr_code_base64 = deferred(Column(Text, nullable=True))
     boleto_url = Column(String(500), nullable=True)
     boleto_barcode = Column(String(100), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
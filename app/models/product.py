@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -15,3 +15,9 @@ class Product(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Parcial: o catalogo so le produtos ativos.
+        Index("ix_products_active", "id", postgresql_where=is_active == True, sqlite_where=is_active == True),
+        Index("ix_products_created", "created_at", "id"),
+    )
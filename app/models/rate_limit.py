@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Float, Boolean, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    # Usada so pelo backend "postgres" do rate limit (app/services/rate_limit.py).
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    allowed = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
@@ -0,0 +1,35 @@
+from datetime import timezone
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.types import TypeDecorator
+from app.database import Base
+
+
+class UTCDateTime(TypeDecorator):
+    # Sempre com fuso: grava em UTC e le de volta como UTC. O SQLite guarda o
+    # texto sem fuso, e o Postgres devolve no TimeZone da sessao.
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None:
+            if value.tzinfo is None:
+                raise ValueError("Datetime sem fuso horario")
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None:
+            value = value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+        return value
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    # Com jti: revoga um token (logout). Sem jti: revoga todos os tokens do
+    # usuario emitidos ate revoked_at (usuario desativado).
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(64), nullable=True)
+    user_id = Column(Integer, nullable=False)
+    revoked_at = Column(UTCDateTime, nullable=False, index=True)
+    expires_at = Column(UTCDateTime, nullable=False, index=True)
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, Numeric
+from app.database import Base
+
+
+class StatsCounter(Base):
+    __tablename__ = "stats_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(Numeric(14, 2), nullable=False, default=0)
@@ -1,21 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Literal, Optional
 from datetime import datetime
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.models.user import User
 from app.models.product import Product
 from app.models.order import Order
 from app.models.payment import Payment
+from app.schemas.bulk import BulkOrderStatusUpdate, BulkUpdateResponse, BulkUserActiveUpdate, BulkUserAdminUpdate
 from app.schemas.user import UserListResponse
 from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
-from app.schemas.order import OrderResponse, OrderStatusUpdate
+from app.schemas.order import OrderBatchCreate, OrderBatchResponse, OrderResponse, OrderStatusUpdate
+from app.schemas.pagination import Page
 from app.security import get_current_user
+from app.services.catalog_cache import catalog_cache
+from app.services.export import export_response, orders_export_query, payments_export_query, users_export_query
+from app.services.orders import bulk_update_order_status, create_order_batch
+from app.services.pagination import keyset_rows, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.services.projection import order_projection, product_projection, user_projection, with_order_items
+from app.services.stats_counters import read_stats, record_order_status_change
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import UserPrincipal, user_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
+ExportFormat = Literal["csv", "ndjson"]
 
-def require_admin(current_user: User = Depends(get_current_user)):
+
+async def require_admin(current_user: UserPrincipal = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -24,28 +38,71 @@ def require_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+def _filter_users(stmt, is_active, is_admin, person_type, created_from, created_to):
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    if is_admin is not None:
+        stmt = stmt.where(User.is_admin == is_admin)
+    if person_type:
+        stmt = stmt.where(User.person_type == person_type)
+    if created_from:
+        stmt = stmt.where(User.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(User.created_at < created_to)
+    return stmt
+
+
+def _filter_orders(stmt, order_status, person_type, user_id, created_from, created_to):
+    if order_status:
+        stmt = stmt.where(Order.status == order_status)
+    if person_type:
+        stmt = stmt.where(Order.person_type == person_type)
+    if user_id is not None:
+        stmt = stmt.where(Order.user_id == user_id)
+    if created_from:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Order.created_at < created_to)
+    return stmt
+
+
 # Users management
-@router.get("/users", response_model=List[UserListResponse])
-def list_users(admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    users = db.query(User).order_by(User.created_at.desc()).all()
-    return users
+@router.get("/users", response_model=Page[UserListResponse])
+async def list_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+    person_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: UserPrincipal = Depends(require_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    stmt = _filter_users(user_projection.select(), is_active, is_admin, person_type, created_from, created_to)
+    rows, next_cursor = await keyset_rows(db, stmt, User, limit, cursor)
+    return user_projection.page_response(rows, next_cursor)
 
 
 @router.put("/users/{user_id}/toggle-active")
-def toggle_user_active(user_id: int, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def toggle_user_active(user_id: int, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario nao encontrado")
 
     user.is_active = not user.is_active
-    db.commit()
+    await db.commit()
+    user_cache.invalidate(user.id)
+    if not user.is_active:
+        # Os tokens ja emitidos param de valer em todos os processos, sem esperar o TTL do user_cache.
+        await token_revocations.revoke_user(db, user.id)
 
     return {"message": f"Usuario {'ativado' if user.is_active else 'desativado'} com sucesso"}
 
 
 @router.put("/users/{user_id}/toggle-admin")
-def toggle_user_admin(user_id: int, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def toggle_user_admin(user_id: int, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario nao encontrado")
 
@@ -53,21 +110,74 @@ def toggle_user_admin(user_id: int, admin: User = Depends(require_admin), db: Se
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voce nao pode alterar seu proprio status de admin")
 
     user.is_admin = not user.is_admin
-    db.commit()
+    await db.commit()
+    user_cache.invalidate(user.id)
 
     return {"message": f"Usuario {'promovido a admin' if user.is_admin else 'rebaixado de admin'} com sucesso"}
 
 
+def _bulk_result(requested, updated) -> dict:
+    return {"updated": sorted(updated), "not_found": sorted(set(requested) - set(updated))}
+
+
+async def _bulk_update_users(db: AsyncSession, user_ids, **values):
+    # Um UPDATE ... WHERE id IN (...) RETURNING no lugar de um load/commit por usuario.
+    return (await db.scalars(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(**values)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+
+@router.put("/users/bulk-active", response_model=BulkUpdateResponse)
+async def bulk_set_users_active(data: BulkUserActiveUpdate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    user_ids = sorted(set(data.user_ids))
+    updated = await _bulk_update_users(db, user_ids, is_active=data.is_active)
+    if data.is_active:
+        await db.commit()
+    else:
+        # Revogacao na mesma transacao do UPDATE (um commit so).
+        await token_revocations.revoke_users(db, updated)
+    for user_id in updated:
+        user_cache.invalidate(user_id)
+    return _bulk_result(user_ids, updated)
+
+
+@router.put("/users/bulk-admin", response_model=BulkUpdateResponse)
+async def bulk_set_users_admin(data: BulkUserAdminUpdate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    user_ids = sorted(set(data.user_ids))
+    if admin.id in user_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Voce nao pode alterar seu proprio status de admin")
+
+    updated = await _bulk_update_users(db, user_ids, is_admin=data.is_admin)
+    await db.commit()
+    for user_id in updated:
+        user_cache.invalidate(user_id)
+    return _bulk_result(user_ids, updated)
+
+
 # Products management
-@router.get("/products", response_model=List[ProductResponse])
-def list_all_products(admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    products = db.query(Product).order_by(Product.created_at.desc()).all()
-    return products
+@router.get("/products", response_model=Page[ProductResponse])
+async def list_all_products(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    is_active: Optional[bool] = None,
+    admin: UserPrincipal = Depends(require_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    stmt = product_projection.select()
+    if is_active is not None:
+        stmt = stmt.where(Product.is_active == is_active)
+
+    rows, next_cursor = await keyset_rows(db, stmt, Product, limit, cursor)
+    return product_projection.page_response(rows, next_cursor)
 
 
 @router.post("/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
-def create_product(product_data: ProductCreate, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    existing = db.query(Product).filter(Product.slug == product_data.slug).first()
+async def create_product(product_data: ProductCreate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(Product).where(Product.slug == product_data.slug))
     if existing:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Slug ja existe")
 
@@ -80,15 +190,16 @@ def create_product(product_data: ProductCreate, admin: User = Depends(require_ad
     )
 
     db.add(product)
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
+    catalog_cache.invalidate()
 
     return product
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
-def update_product(product_id: int, product_data: ProductUpdate, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def update_product(product_id: int, product_data: ProductUpdate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto nao encontrado")
 
@@ -103,73 +214,138 @@ def update_product(product_id: int, product_data: ProductUpdate, admin: User = D
     if product_data.is_active is not None:
         product.is_active = product_data.is_active
 
-    db.commit()
-    db.refresh(product)
+    await db.commit()
+    await db.refresh(product)
+    catalog_cache.invalidate()
 
     return product
 
 
 @router.delete("/products/{product_id}")
-def delete_product(product_id: int, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def delete_product(product_id: int, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    product = await db.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Produto nao encontrado")
 
     product.is_active = False
-    db.commit()
+    await db.commit()
+    catalog_cache.invalidate()
 
     return {"message": "Produto desativado com sucesso"}
 
 
 # Orders management
-@router.get("/orders", response_model=List[OrderResponse])
-def list_all_orders(admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    orders = db.query(Order).order_by(Order.created_at.desc()).all()
-    return orders
+@router.get("/orders", response_model=Page[OrderResponse])
+async def list_all_orders(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    order_status: Optional[str] = Query(None, alias="status"),
+    person_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: UserPrincipal = Depends(require_admin),
+    db: AsyncSession = Depends(get_read_db)
+):
+    stmt = _filter_orders(order_projection.select(), order_status, person_type, user_id, created_from, created_to)
+    rows, next_cursor = await keyset_rows(db, stmt, Order, limit, cursor)
+    return order_projection.page_response(await with_order_items(db, rows), next_cursor)
+
+
+@router.post("/orders/batch", response_model=OrderBatchResponse)
+async def create_orders_batch(batch: OrderBatchCreate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    # Importacao em lote: o resultado vem por pedido, na ordem enviada, e um
+    # pedido invalido nao impede os outros.
+    results = await create_order_batch(db, batch.orders)
+    created = sum(1 for result in results if result.get("order_id") is not None)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+@router.put("/orders/bulk-status", response_model=BulkUpdateResponse)
+async def bulk_update_orders_status(data: BulkOrderStatusUpdate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    order_ids = sorted(set(data.order_ids))
+    updated = await bulk_update_order_status(db, order_ids, data.status)
+    return _bulk_result(order_ids, updated)
 
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-def get_order_detail(order_id: int, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+async def get_order_detail(order_id: int, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    order = await db.get(Order, order_id, options=[selectinload(Order.items)])
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido nao encontrado")
     return order
 
 
 @router.put("/orders/{order_id}/status", response_model=OrderResponse)
-def update_order_status(order_id: int, status_data: OrderStatusUpdate, admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+async def update_order_status(order_id: int, status_data: OrderStatusUpdate, admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_db)):
+    order = await db.get(Order, order_id, options=[selectinload(Order.items)])
     if not order:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Pedido nao encontrado")
 
+    await record_order_status_change(db, order.status, status_data.status, order.total)
     order.status = status_data.status
 
     if status_data.status == "paid" and not order.paid_at:
         order.paid_at = datetime.utcnow()
+    elif status_data.status == "completed" and not order.completed_at:
+        order.completed_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(order)
+    await db.commit()
 
     return order
 
 
+# Exports
+@router.get("/export/orders")
+async def export_orders(
+    format: ExportFormat = "csv",
+    order_status: Optional[str] = Query(None, alias="status"),
+    person_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: UserPrincipal = Depends(require_admin)
+):
+    stmt = _filter_orders(orders_export_query(), order_status, person_type, user_id, created_from, created_to)
+    return export_response(stmt, format, "pedidos")
+
+
+@router.get("/export/payments")
+async def export_payments(
+    format: ExportFormat = "csv",
+    payment_status: Optional[str] = Query(None, alias="status"),
+    method: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: UserPrincipal = Depends(require_admin)
+):
+    stmt = payments_export_query()
+    if payment_status:
+        stmt = stmt.where(Payment.status == payment_status)
+    if method:
+        stmt = stmt.where(Payment.method == method)
+    if created_from:
+        stmt = stmt.where(Payment.created_at >= created_from)
+    if created_to:
+        stmt = stmt.where(Payment.created_at < created_to)
+    return export_response(stmt, format, "pagamentos")
+
+
+@router.get("/export/users")
+async def export_users(
+    format: ExportFormat = "csv",
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+    person_type: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    admin: UserPrincipal = Depends(require_admin)
+):
+    stmt = _filter_users(users_export_query(), is_active, is_admin, person_type, created_from, created_to)
+    return export_response(stmt, format, "usuarios")
+
+
 # Dashboard stats
 @router.get("/stats")
-def get_dashboard_stats(admin: User = Depends(require_admin), db: Session = Depends(get_db)):
-    total_users = db.query(User).count()
-    total_orders = db.query(Order).count()
-    paid_orders = db.query(Order).filter(Order.status == "paid").count()
-    pending_orders = db.query(Order).filter(Order.status == "pending").count()
-    total_products = db.query(Product).filter(Product.is_active == True).count()
-
-    from sqlalchemy import func
-    total_revenue = db.query(func.sum(Order.total)).filter(Order.status == "paid").scalar() or 0
-
-    return {
-        "total_users": total_users,
-        "total_orders": total_orders,
-        "paid_orders": paid_orders,
-        "pending_orders": pending_orders,
-        "total_products": total_products,
-        "total_revenue": float(total_revenue)
-    }
+async def get_dashboard_stats(admin: UserPrincipal = Depends(require_admin), db: AsyncSession = Depends(get_read_db)):
+    return await read_stats(db)
@@ -1,69 +1,98 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserRegister, UserLogin, UserResponse, Token, UserUpdate
-from app.security import get_password_hash, verify_password, create_access_token, get_current_user
+from app.security import (
+    get_password_hash_async, verify_password_async, password_needs_rehash, create_access_token, decode_token,
+    get_current_user_model
+)
+from app.services.stats_counters import record_user_registered
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import user_cache
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
+optional_bearer = HTTPBearer(auto_error=False)
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserRegister, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email ja cadastrado"
-        )
+UNIQUE_FIELDS = (("email", "Email ja cadastrado"), ("cpf", "CPF ja cadastrado"), ("cnpj", "CNPJ ja cadastrado"))
+
+
+def _unique_violation_detail(exc: IntegrityError) -> str:
+    # Nome da constraint (psycopg) ou a mensagem do banco indicam qual campo colidiu.
+    diag = getattr(exc.orig, "diag", None)
+    text = f"{getattr(diag, 'constraint_name', '') or ''} {exc.orig}".lower()
+    for field, detail in UNIQUE_FIELDS:
+        if field in text:
+            return detail
+    return "Usuario ja cadastrado"
 
-    if user_data.cpf:
-        existing_cpf = db.query(User).filter(User.cpf == user_data.cpf).first()
-        if existing_cpf:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CPF ja cadastrado"
-            )
 
+@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
+    # Uma consulta verifica email, CPF e CNPJ de uma vez, antes de gastar bcrypt.
+    conditions = [User.email == user_data.email]
+    if user_data.cpf:
+        conditions.append(User.cpf == user_data.cpf)
     if user_data.cnpj:
-        existing_cnpj = db.query(User).filter(User.cnpj == user_data.cnpj).first()
-        if existing_cnpj:
+        conditions.append(User.cnpj == user_data.cnpj)
+
+    collisions = (await db.execute(select(User.email, User.cpf, User.cnpj).where(or_(*conditions)).limit(3))).all()
+    for field, detail in UNIQUE_FIELDS:
+        value = getattr(user_data, field)
+        if value and any(getattr(row, field) == value for row in collisions):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="CNPJ ja cadastrado"
+                detail=detail
             )
 
-    hashed_password = get_password_hash(user_data.password)
-
-    new_user = User(
-        name=user_data.name,
-        email=user_data.email,
-        password=hashed_password,
-        person_type=user_data.person_type,
-        cpf=user_data.cpf,
-        cnpj=user_data.cnpj,
-        phone=user_data.phone,
-        cep=user_data.cep,
-        street=user_data.street,
-        number=user_data.number,
-        complement=user_data.complement,
-        neighborhood=user_data.neighborhood,
-        city=user_data.city,
-        state=user_data.state
-    )
-
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    hashed_password = await get_password_hash_async(user_data.password)
+
+    try:
+        # INSERT ... RETURNING devolve o usuario completo (incluindo created_at),
+        # sem o SELECT do refresh.
+        new_user = await db.scalar(
+            insert(User)
+            .values(
+                name=user_data.name,
+                email=user_data.email,
+                password=hashed_password,
+                person_type=user_data.person_type,
+                cpf=user_data.cpf,
+                cnpj=user_data.cnpj,
+                phone=user_data.phone,
+                cep=user_data.cep,
+                street=user_data.street,
+                number=user_data.number,
+                complement=user_data.complement,
+                neighborhood=user_data.neighborhood,
+                city=user_data.city,
+                state=user_data.state
+            )
+            .returning(User)
+        )
+        await record_user_registered(db)
+        await db.commit()
+    except IntegrityError as exc:
+        # Cadastro concorrente com os mesmos dados passou pela verificacao.
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_unique_violation_detail(exc)
+        )
 
     return new_user
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == credentials.email))
 
-    if not user or not verify_password(credentials.password, user.password):
+    if not user or not await verify_password_async(credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciais invalidas"
@@ -75,23 +104,34 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Usuario desativado"
         )
 
+    if password_needs_rehash(user.password):
+        user.password = await get_password_hash_async(credentials.password)
+        await db.commit()
+
     access_token = create_access_token(data={"sub": str(user.id)})
 
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.post("/logout")
-def logout():
+async def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    db: AsyncSession = Depends(get_db)
+):
+    # Sem token (ou ja invalido) continua respondendo sucesso: nao ha o que revogar.
+    payload = decode_token(credentials.credentials) if credentials else None
+    if payload and payload.get("jti") and not token_revocations.is_revoked(payload):
+        await token_revocations.revoke_token(db, payload)
     return {"message": "Logout realizado com sucesso"}
 
 
 @router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: User = Depends(get_current_user_model)):
     return current_user
 
 
 @router.put("/me", response_model=UserResponse)
-def update_me(user_data: UserUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def update_me(user_data: UserUpdate, current_user: User = Depends(get_current_user_model), db: AsyncSession = Depends(get_db)):
     if user_data.name is not None:
         current_user.name = user_data.name
     if user_data.phone is not None:
@@ -117,7 +157,8 @@ def update_me(user_data: UserUpdate, current_user: User = Depends(get_current_us
     if user_data.state is not None:
         current_user.state = user_data.state
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    user_cache.invalidate(current_user.id)
 
     return current_user
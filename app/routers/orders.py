@@ -1,86 +1,92 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
-from decimal import Decimal
-from app.database import get_db
-from app.models.user import User
+from app.database import get_db, get_read_db
 from app.models.product import Product
 from app.models.order import Order, OrderItem
 from app.schemas.order import OrderCreate, OrderResponse
 from app.security import get_current_user
+from app.services.user_cache import UserPrincipal
+from app.services.orders import merge_quantities, missing_products_detail, price_items
+from app.services.projection import order_projection, with_order_items
+from app.services.stats_counters import record_order_created
 
 router = APIRouter(prefix="/api/orders", tags=["orders"])
 
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
+async def create_order(
     order_data: OrderCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     person_type = order_data.person_type or current_user.person_type or "pf"
 
+    quantities = merge_quantities(order_data.items)
+
+    products = {
+        product.id: product
+        for product in await db.scalars(
+            select(Product).where(Product.id.in_(list(quantities)), Product.is_active == True)
+        )
+    }
+
+    missing = [product_id for product_id in quantities if product_id not in products]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=missing_products_detail(missing)
+        )
+
+    items, subtotal = price_items(quantities, products, person_type)
+
     order = Order(
         user_id=current_user.id,
         status="pending",
         person_type=person_type,
-        subtotal=Decimal("0"),
-        total=Decimal("0"),
-        notes=order_data.notes
+        subtotal=subtotal,
+        total=subtotal,
+        notes=order_data.notes,
+        updated_at=None,  # evita o SELECT extra do eager_defaults para a coluna onupdate
+        items=[OrderItem(**item) for item in items]
     )
     db.add(order)
-    db.flush()
+    await record_order_created(db, order.status, order.total)
 
-    subtotal = Decimal("0")
+    # Um flush: INSERT do pedido com RETURNING e os itens num unico INSERT multi-row.
+    await db.flush()
+    response = OrderResponse.model_validate(order)
+    await db.commit()
 
-    for item_data in order_data.items:
-        product = db.query(Product).filter(Product.id == item_data.product_id, Product.is_active == True).first()
-        if not product:
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Produto {item_data.product_id} nao encontrado"
-            )
-
-        unit_price = product.price_pj if person_type == "pj" else product.price_pf
-        total_price = unit_price * item_data.quantity
-
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=product.id,
-            product_name=product.name,
-            quantity=item_data.quantity,
-            unit_price=unit_price,
-            total_price=total_price
-        )
-        db.add(order_item)
-        subtotal += total_price
-
-    order.subtotal = subtotal
-    order.total = subtotal
-
-    db.commit()
-    db.refresh(order)
-
-    return order
+    return response
 
 
 @router.get("", response_model=List[OrderResponse])
-def list_orders(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def list_orders(
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
-    return orders
+    rows = (await db.execute(
+        order_projection.select()
+        .where(Order.user_id == current_user.id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )).all()
+    return order_projection.list_response(await with_order_items(db, rows))
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
-def get_order(
+async def get_order(
     order_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
+    order = await db.scalar(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.id == order_id, Order.user_id == current_user.id)
+    )
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
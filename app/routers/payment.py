@@ -1,32 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from datetime import datetime
-import mercadopago
+import asyncio
+import base64
+import json
 from app.database import get_db
 from app.config import settings
-from app.models.user import User
 from app.models.order import Order
 from app.models.payment import Payment
-from app.schemas.payment import PaymentPreferenceCreate, CardPaymentCreate, PaymentResponse, PaymentPreferenceResponse
+from app.models.webhook import WebhookEvent
+from app.schemas.payment import (
+    PaymentPreferenceCreate, CardPaymentCreate, PaymentResponse, PaymentStatusResponse, PaymentPreferenceResponse
+)
 from app.security import get_current_user
+from app.services.user_cache import UserPrincipal
+from app.services.catalog_cache import etag_matches
+from app.services.payment_gateway import get_payment_gateway
+from app.services.payment_notifier import payment_notifier, TERMINAL_STATUSES
+from app.services.stats_counters import record_order_status_change
+from app.services.webhook_inbox import drain_webhook_inbox
 
 router = APIRouter(prefix="/api/payment", tags=["payment"])
 
-sdk = mercadopago.SDK(settings.MP_ACCESS_TOKEN)
+
+def _mp_idempotency_key(request: Request, current_user: UserPrincipal, method: str):
+    # Com Idempotency-Key do cliente, o MP recebe uma chave derivada dela: se
+    # a nossa resposta falhar depois da cobranca, o retry nao cobra de novo.
+    key = request.headers.get("idempotency-key")
+    return f"{current_user.id}-{method}-{key}" if key else None
 
 
 @router.get("/public-key")
-def get_public_key():
+async def get_public_key():
     return {"public_key": settings.MP_PUBLIC_KEY}
 
 
 @router.post("/preference", response_model=PaymentPreferenceResponse)
-def create_preference(
+async def create_preference(
     data: PaymentPreferenceCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(Order).filter(Order.id == data.order_id, Order.user_id == current_user.id).first()
+    order = await db.scalar(
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.id == data.order_id, Order.user_id == current_user.id)
+    )
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -72,7 +94,7 @@ def create_preference(
     elif data.payment_method == "boleto":
         preference_data["payment_methods"]["default_payment_method_id"] = "bolbradesco"
 
-    preference_response = sdk.preference().create(preference_data)
+    preference_response = await get_payment_gateway().create_preference(preference_data)
 
     if preference_response["status"] != 201:
         raise HTTPException(
@@ -90,12 +112,13 @@ def create_preference(
 
 
 @router.post("/pix", response_model=PaymentResponse)
-def create_pix_payment(
+async def create_pix_payment(
+    request: Request,
     data: PaymentPreferenceCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(Order).filter(Order.id == data.order_id, Order.user_id == current_user.id).first()
+    order = await db.scalar(select(Order).where(Order.id == data.order_id, Order.user_id == current_user.id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,7 +148,9 @@ def create_pix_payment(
             "number": current_user.cpf.replace(".", "").replace("-", "")
         }
 
-    payment_response = sdk.payment().create(payment_data)
+    payment_response = await get_payment_gateway().create_payment(
+        payment_data, idempotency_key=_mp_idempotency_key(request, current_user, "pix")
+    )
 
     if payment_response["status"] not in [200, 201]:
         raise HTTPException(
@@ -142,23 +167,26 @@ def create_pix_payment(
         status=mp_payment["status"],
         amount=order.total,
         pix_qr_code=mp_payment.get("point_of_interaction", {}).get("transaction_data", {}).get("qr_code"),
-        pix_qr_code_base64=mp_payment.get("point_of_interaction", {}).get("transaction_data", {}).get("qr_code_base64")
+        pix_qr_code_base64=mp_payment.get("point_of_interaction", {}).get("transaction_data", {}).get("qr_code_base64"),
+        updated_at=None
     )
 
+    # Sem refresh: ele expiraria o QR Code (coluna deferred) ja em memoria, e
+    # created_at volta no RETURNING do INSERT (eager_defaults).
     db.add(payment)
-    db.commit()
-    db.refresh(payment)
+    await db.commit()
 
     return payment
 
 
-@router.post("/card", response_model=PaymentResponse)
-def create_card_payment(
+@router.post("/card", response_model=PaymentStatusResponse)
+async def create_card_payment(
+    request: Request,
     data: CardPaymentCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(Order).filter(Order.id == data.order_id, Order.user_id == current_user.id).first()
+    order = await db.scalar(select(Order).where(Order.id == data.order_id, Order.user_id == current_user.id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -185,7 +213,9 @@ def create_card_payment(
     if data.issuer_id:
         payment_data["issuer_id"] = data.issuer_id
 
-    payment_response = sdk.payment().create(payment_data)
+    payment_response = await get_payment_gateway().create_payment(
+        payment_data, idempotency_key=_mp_idempotency_key(request, current_user, "card")
+    )
 
     if payment_response["status"] not in [200, 201]:
         error_message = payment_response.get("response", {}).get("message", "Erro ao processar pagamento")
@@ -207,63 +237,59 @@ def create_card_payment(
     db.add(payment)
 
     if mp_payment["status"] == "approved":
+        await record_order_status_change(db, order.status, "paid", order.total)
         order.status = "paid"
         order.paid_at = datetime.utcnow()
         payment.paid_at = datetime.utcnow()
 
-    db.commit()
-    db.refresh(payment)
+    await db.commit()
+    await db.refresh(payment)
+    await payment_notifier.publish(order.id, payment.status)
 
     return payment
 
 
 @router.post("/webhook")
-async def payment_webhook(request: Request, db: Session = Depends(get_db)):
-    body = await request.json()
-
-    if body.get("type") == "payment":
-        payment_id = body.get("data", {}).get("id")
-
-        if payment_id:
-            payment_info = sdk.payment().get(payment_id)
-
-            if payment_info["status"] == 200:
-                mp_payment = payment_info["response"]
-                external_reference = mp_payment.get("external_reference")
-
-                if external_reference:
-                    order = db.query(Order).filter(Order.id == int(external_reference)).first()
-
-                    if order:
-                        payment = db.query(Payment).filter(Payment.order_id == order.id).first()
-
-                        if payment:
-                            payment.status = mp_payment["status"]
-
-                            if mp_payment["status"] == "approved":
-                                order.status = "paid"
-                                order.paid_at = datetime.utcnow()
-                                payment.paid_at = datetime.utcnow()
-
-                            db.commit()
+async def payment_webhook(request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
+    # So grava o evento bruto e responde; o processamento fica com o worker da fila.
+    raw = await request.body()
+    try:
+        body = json.loads(raw) if raw else {}
+    except ValueError:
+        body = {}
+    if not isinstance(body, dict):
+        body = {}
+
+    topic = body.get("type") or request.query_params.get("type") or request.query_params.get("topic")
+    resource_id = (body.get("data") or {}).get("id") or request.query_params.get("data.id") or request.query_params.get("id")
+
+    db.add(WebhookEvent(
+        topic=topic,
+        resource_id=str(resource_id) if resource_id else None,
+        payload=raw.decode("utf-8", errors="replace")
+    ))
+    await db.commit()
+
+    if not settings.WEBHOOK_WORKER_ENABLED:
+        background_tasks.add_task(drain_webhook_inbox)
 
     return {"status": "ok"}
 
 
-@router.get("/status/{order_id}", response_model=PaymentResponse)
-def get_payment_status(
+@router.get("/status/{order_id}", response_model=PaymentStatusResponse)
+async def get_payment_status(
     order_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    order = db.query(Order).filter(Order.id == order_id, Order.user_id == current_user.id).first()
+    order = await db.scalar(select(Order).where(Order.id == order_id, Order.user_id == current_user.id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pedido nao encontrado"
         )
 
-    payment = db.query(Payment).filter(Payment.order_id == order_id).order_by(Payment.created_at.desc()).first()
+    payment = await db.scalar(select(Payment).where(Payment.order_id == order_id).order_by(Payment.created_at.desc()).limit(1))
     if not payment:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -271,3 +297,97 @@ def get_payment_status(
         )
 
     return payment
+
+
+@router.get("/pix/{order_id}/qrcode.png")
+async def get_pix_qr_code(
+    order_id: int,
+    request: Request,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # O QR de um pagamento nunca muda: PNG binario com cache longo no navegador,
+    # em vez de base64 repetido em cada resposta JSON.
+    row = (await db.execute(
+        select(Payment.mp_payment_id, Payment.pix_qr_code_base64)
+        .join(Order, Order.id == Payment.order_id)
+        .where(Order.id == order_id, Order.user_id == current_user.id, Payment.method == "pix")
+        .order_by(Payment.created_at.desc())
+        .limit(1)
+    )).first()
+    if not row or not row.pix_qr_code_base64:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="QR Code nao encontrado"
+        )
+
+    etag = f'"pix-{row.mp_payment_id}"'
+    headers = {"Cache-Control": "private, max-age=86400, immutable", "ETag": etag}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=base64.b64decode(row.pix_qr_code_base64), media_type="image/png", headers=headers)
+
+
+def _sse_event(order_id: int, payment_status) -> str:
+    return f"event: status\ndata: {json.dumps({'order_id': order_id, 'status': payment_status})}\n\n"
+
+
+@router.get("/status/{order_id}/stream")
+async def stream_payment_status(
+    order_id: int,
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # Server-Sent Events: uma consulta ao abrir e depois so espera o notifier,
+    # em vez do checkout consultar /status a cada poucos segundos.
+    queue = payment_notifier.subscribe(order_id)
+    try:
+        row = (await db.execute(
+            select(Order.id, Payment.status)
+            .outerjoin(Payment, Payment.order_id == Order.id)
+            .where(Order.id == order_id, Order.user_id == current_user.id)
+            .order_by(Payment.created_at.desc())
+            .limit(1)
+        )).first()
+        # Devolve a conexao ao pool antes de segurar a requisicao aberta.
+        await db.close()
+    except BaseException:
+        payment_notifier.unsubscribe(order_id, queue)
+        raise
+
+    if not row:
+        payment_notifier.unsubscribe(order_id, queue)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Pedido nao encontrado"
+        )
+
+    async def events():
+        try:
+            current = row.status
+            yield _sse_event(order_id, current)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.PAYMENT_STREAM_MAX_SECONDS
+            while current not in TERMINAL_STATUSES:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    new_status = await asyncio.wait_for(
+                        queue.get(), timeout=min(settings.PAYMENT_STREAM_HEARTBEAT_SECONDS, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if new_status != current:
+                    current = new_status
+                    yield _sse_event(order_id, current)
+        finally:
+            payment_notifier.unsubscribe(order_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,36 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import List
-from app.database import get_db
-from app.models.product import Product
 from app.schemas.product import ProductResponse
+from app.services.catalog_cache import catalog_cache, cached_json_response
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
 
 @router.get("", response_model=List[ProductResponse])
-def list_products(db: Session = Depends(get_db)):
-    products = db.query(Product).filter(Product.is_active == True).all()
-    return products
+async def list_products(request: Request):
+    catalog = await catalog_cache.get()
+    return cached_json_response(request, catalog.listing)
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id, Product.is_active == True).first()
-    if not product:
+async def get_product(product_id: int, request: Request):
+    catalog = await catalog_cache.get()
+    entry = catalog.by_id.get(product_id)
+    if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Produto nao encontrado"
         )
-    return product
+    return cached_json_response(request, entry)
 
 
 @router.get("/slug/{slug}", response_model=ProductResponse)
-def get_product_by_slug(slug: str, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.slug == slug, Product.is_active == True).first()
-    if not product:
+async def get_product_by_slug(slug: str, request: Request):
+    catalog = await catalog_cache.get()
+    entry = catalog.by_slug.get(slug)
+    if not entry:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Produto nao encontrado"
         )
-    return product
+    return cached_json_response(request, entry)
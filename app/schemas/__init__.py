@@ -2,3 +2,5 @@ from app.schemas.user import *
 from app.schemas.product import *
 from app.schemas.order import *
 from app.schemas.payment import *
+from app.schemas.pagination import *
+from app.schemas.bulk import *
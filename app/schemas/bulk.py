@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+MAX_BULK_IDS = 5000
+
+
+class BulkUserActiveUpdate(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=MAX_BULK_IDS)
+    is_active: bool
+
+
+class BulkUserAdminUpdate(BaseModel):
+    user_ids: List[int] = Field(min_length=1, max_length=MAX_BULK_IDS)
+    is_admin: bool
+
+
+class BulkOrderStatusUpdate(BaseModel):
+    order_ids: List[int] = Field(min_length=1, max_length=MAX_BULK_IDS)
+    status: str
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: List[int]
+    not_found: List[int]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from decimal import Decimal
 from datetime import datetime
@@ -45,3 +45,28 @@ class OrderResponse(BaseModel):
 
 class OrderStatusUpdate(BaseModel):
     status: str
+
+
+MAX_BATCH_ORDERS = 5000
+
+
+class BatchOrderCreate(OrderCreate):
+    user_id: int
+
+
+class OrderBatchCreate(BaseModel):
+    orders: List[BatchOrderCreate] = Field(min_length=1, max_length=MAX_BATCH_ORDERS)
+
+
+class OrderBatchResult(BaseModel):
+    # index e a posicao do pedido no lote enviado; order_id ou error.
+    index: int
+    order_id: Optional[int] = None
+    total: Optional[Decimal] = None
+    error: Optional[str] = None
+
+
+class OrderBatchResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[OrderBatchResult]
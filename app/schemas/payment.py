@@ -17,7 +17,7 @@ class CardPaymentCreate(BaseModel):
     issuer_id: Optional[str] = None
 
 
-class PaymentResponse(BaseModel):
+class PaymentStatusResponse(BaseModel):
     id: int
     order_id: int
     mp_payment_id: Optional[str] = None
@@ -25,7 +25,6 @@ class PaymentResponse(BaseModel):
     status: str
     amount: Decimal
     pix_qr_code: Optional[str] = None
-    pix_qr_code_base64: Optional[str] = None
     created_at: Optional[datetime] = None
     paid_at: Optional[datetime] = None
 
@@ -33,6 +32,10 @@ class PaymentResponse(BaseModel):
         from_attributes = True
 
 
+class PaymentResponse(PaymentStatusResponse):
+    pix_qr_code_base64: Optional[str] = None
+
+
 class PaymentPreferenceResponse(BaseModel):
     preference_id: str
     init_point: str
@@ -1,28 +1,78 @@
-from datetime import datetime, timedelta
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import settings
-from app.database import get_db
+from app.database import get_db, request_user_id
+from app.services.token_revocation import token_revocations
+from app.services.user_cache import UserPrincipal, user_cache
 
 security = HTTPBearer()
 
 
+# bcrypt libera o GIL, entao um pool pequeno de threads dedicado roda os hashes
+# em paralelo sem ocupar o threadpool do Starlette. O semaforo limita quantos
+# hashes rodam ao mesmo tempo e por quanto tempo uma requisicao espera na fila.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = asyncio.Semaphore(settings.BCRYPT_MAX_WORKERS)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    try:
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+async def _run_hashing(func, *args):
+    acquire = asyncio.ensure_future(_hash_slots.acquire())
+    done, _ = await asyncio.wait({acquire}, timeout=settings.BCRYPT_QUEUE_TIMEOUT_SECONDS)
+    if not done:
+        acquire.cancel()
+        try:
+            await acquire
+        except asyncio.CancelledError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado, tente novamente",
+                headers={"Retry-After": "1"}
+            )
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    # jti identifica o token no logout; iat permite revogar tudo que foi emitido
+    # ate um instante, e vai com microssegundos: um login logo depois de uma
+    # revogacao, no mesmo segundo, nao pode cair nela.
+    to_encode.update({"exp": expire, "iat": now.timestamp(), "jti": uuid.uuid4().hex})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
@@ -33,18 +83,41 @@ def decode_token(token: str) -> Optional[dict]:
         return None
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: AsyncSession = Depends(get_db)) -> UserPrincipal:
     from app.models.user import User
     payload = decode_token(credentials.credentials)
     if not payload:
         raise HTTPException(status_code=401, detail="Token invalido")
-    user = db.query(User).filter(User.id == int(payload.get("sub"))).first()
+
+    await token_revocations.ensure_fresh()
+    if token_revocations.is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Token revogado")
+
+    user_id = int(payload.get("sub"))
+    request_user_id.set(user_id)
+    principal = user_cache.get(user_id)
+    if principal is None:
+        user = await db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=401, detail="Usuario nao encontrado")
+        principal = UserPrincipal.from_user(user)
+        user_cache.set(principal)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=403, detail="Usuario desativado")
+    return principal
+
+
+async def get_current_user_model(current_user: UserPrincipal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    # Para handlers que precisam do User completo (ORM); carregado so quando pedido.
+    from app.models.user import User
+    user = await db.get(User, current_user.id)
     if not user:
         raise HTTPException(status_code=401, detail="Usuario nao encontrado")
     return user
 
 
-async def get_current_admin(current_user=Depends(get_current_user)):
+async def get_current_admin(current_user: UserPrincipal = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Acesso negado")
     return current_user
@@ -0,0 +1,65 @@
+import json
+from typing import Optional
+from app.security import decode_token
+
+
+def header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def bearer_payload(scope) -> Optional[dict]:
+    # So valida a assinatura do JWT (sem banco): serve para chavear, nao para autorizar.
+    scheme, _, token = (header(scope, b"authorization") or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return decode_token(token)
+
+
+def bearer_user_id(scope) -> Optional[int]:
+    return token_user_id(bearer_payload(scope))
+
+
+def token_user_id(payload: Optional[dict]) -> Optional[int]:
+    try:
+        return int(payload["sub"])
+    except (TypeError, KeyError, ValueError):
+        return None
+
+
+async def send_json(send, status_code: int, body: bytes, extra_headers=()):
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("ascii"))]
+    await send({"type": "http.response.start", "status": status_code, "headers": headers + list(extra_headers)})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_error(send, status_code: int, detail: str, extra_headers=()):
+    await send_json(send, status_code, json.dumps({"detail": detail}).encode("utf-8"), extra_headers)
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+def replay_body(body: bytes, receive):
+    # receive para a aplicacao interna depois que o middleware ja leu o corpo.
+    sent = False
+
+    async def receive_body():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return receive_body
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+import time
+from typing import Dict, List, Optional
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.product import Product
+from app.schemas.product import ProductResponse
+from app.services.projection import product_projection
+
+_product_list = TypeAdapter(List[ProductResponse])
+
+
+class CachedBody:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class CatalogSnapshot:
+    def __init__(self, version: int, products: List[ProductResponse]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.listing = CachedBody(_product_list.dump_json(products))
+        self.by_id: Dict[int, CachedBody] = {}
+        self.by_slug: Dict[str, CachedBody] = {}
+        for product in products:
+            entry = CachedBody(product.model_dump_json().encode("utf-8"))
+            self.by_id[product.id] = entry
+            self.by_slug[product.slug] = entry
+
+
+class CatalogCache:
+    # Catalogo de produtos ativos em memoria, ja serializado. As rotas de escrita
+    # do admin chamam invalidate(); o TTL limita o tempo que outros processos
+    # (outros workers/instancias) servem uma versao antiga.
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._load_lock = asyncio.Lock()
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+
+    def invalidate(self):
+        self._version += 1
+        self._snapshot = None
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+        )
+
+    async def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        # Uma unica carga por vez; quem esperou reaproveita o snapshot novo.
+        async with self._load_lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            # Sempre do primario: logo depois de um invalidate() a replica pode
+            # ainda nao ter a escrita, e o snapshot antigo ficaria no cache ate o TTL.
+            version = self._version
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(
+                    product_projection.select().where(Product.is_active == True).order_by(Product.id)
+                )).all()
+            snapshot = CatalogSnapshot(version, product_projection.validate(rows))
+
+            # Se houve invalidate() durante a carga, usa o resultado so nesta requisicao.
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+
+
+catalog_cache = CatalogCache(settings.CATALOG_CACHE_TTL_SECONDS)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def cached_json_response(request: Request, entry: CachedBody) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, List, Sequence, Tuple
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from app.database import ReadSessionLocal
+from app.models.order import Order, OrderItem
+from app.models.payment import Payment
+from app.models.user import User
+
+EXPORT_CHUNK_ROWS = 1000
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Texto que a planilha interpretaria como formula (nome, email, produto...).
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+USER_COLUMNS = [
+    ("id", User.id), ("name", User.name), ("email", User.email), ("person_type", User.person_type),
+    ("cpf", User.cpf), ("cnpj", User.cnpj), ("phone", User.phone), ("city", User.city), ("state", User.state),
+    ("is_active", User.is_active), ("is_admin", User.is_admin), ("created_at", User.created_at)
+]
+
+PAYMENT_COLUMNS = [
+    ("id", Payment.id), ("order_id", Payment.order_id), ("user_id", Order.user_id),
+    ("mp_payment_id", Payment.mp_payment_id), ("method", Payment.method), ("status", Payment.status),
+    ("amount", Payment.amount), ("created_at", Payment.created_at), ("paid_at", Payment.paid_at)
+]
+
+# Uma linha por item do pedido, com o pagamento ao lado.
+ORDER_COLUMNS = [
+    ("order_id", Order.id), ("user_id", Order.user_id), ("status", Order.status), ("person_type", Order.person_type),
+    ("subtotal", Order.subtotal), ("total", Order.total), ("created_at", Order.created_at),
+    ("paid_at", Order.paid_at), ("completed_at", Order.completed_at),
+    ("item_product_id", OrderItem.product_id), ("item_product_name", OrderItem.product_name),
+    ("item_quantity", OrderItem.quantity), ("item_unit_price", OrderItem.unit_price),
+    ("item_total_price", OrderItem.total_price),
+    ("payment_method", Payment.method), ("payment_status", Payment.status),
+    ("mp_payment_id", Payment.mp_payment_id)
+]
+
+
+def users_export_query():
+    return select(*_columns(USER_COLUMNS)).order_by(User.id)
+
+
+def payments_export_query():
+    return select(*_columns(PAYMENT_COLUMNS)).join(Order, Order.id == Payment.order_id).order_by(Payment.id)
+
+
+def orders_export_query():
+    return (
+        select(*_columns(ORDER_COLUMNS))
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Payment, Payment.order_id == Order.id)
+        .order_by(Order.id, OrderItem.id)
+    )
+
+
+def _columns(spec: Sequence[Tuple[str, object]]):
+    return [column.label(name) for name, column in spec]
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _csv_cell(value):
+    # So texto vindo do usuario; numeros (Decimal negativo) continuam numeros.
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return _plain(value)
+
+
+def _csv_chunk(rows: List[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_csv_cell(value) for value in row] for row in rows])
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_chunk(names: List[str], rows: List[Sequence]) -> bytes:
+    lines = [json.dumps(dict(zip(names, (_plain(value) for value in row))), ensure_ascii=False) for row in rows]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+async def stream_export(stmt, fmt: str) -> AsyncIterator[bytes]:
+    names = [column.name for column in stmt.selected_columns]
+    if fmt == "csv":
+        # O cabecalho sai antes da consulta: o cliente recebe o primeiro byte na hora.
+        yield _csv_chunk([names])
+
+    # Sessao propria: a do request pode ser fechada antes do corpo terminar.
+    # stream + yield_per usa cursor no servidor e mantem so um lote em memoria.
+    async with ReadSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(names, rows)
+
+
+def export_response(stmt, fmt: str, name: str) -> StreamingResponse:
+    filename = f"{name}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
+    return StreamingResponse(
+        stream_export(stmt, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    )
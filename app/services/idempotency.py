@@ -0,0 +1,178 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.idempotency import IdempotencyKey, IdempotencyStatus
+from app.services.token_revocation import token_revocations
+from app.services.asgi import bearer_payload, header, read_body, replay_body, send_error, send_json, token_user_id
+
+IDEMPOTENT_ENDPOINTS = {("POST", "/api/orders"), ("POST", "/api/payment/pix"), ("POST", "/api/payment/card")}
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.1
+
+Ident = Tuple[int, str, str]
+
+# Requisicoes em andamento neste processo: duplicatas locais acordam na hora,
+# as de outros processos descobrem pelo banco (polling).
+_in_flight: Dict[Ident, asyncio.Event] = {}
+
+
+async def _claim(ident: Ident, request_hash: str) -> Optional[IdempotencyKey]:
+    # A chave primaria decide quem processa: o INSERT que passa e o dono; os
+    # outros recebem o registro existente. Enquanto processa, expires_at e so o
+    # prazo da trava: se o processo morrer no meio, a chave volta a ficar livre.
+    # Se o registro que barrou o INSERT sumir antes da leitura (o dono liberou
+    # a chave), tenta de novo: ninguem esta processando.
+    user_id, endpoint, key = ident
+    async with AsyncSessionLocal() as db:
+        while True:
+            now = datetime.utcnow()
+            await db.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.endpoint == endpoint,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at <= now
+                )
+            )
+            db.add(IdempotencyKey(
+                user_id=user_id,
+                endpoint=endpoint,
+                key=key,
+                request_hash=request_hash,
+                status=IdempotencyStatus.PROCESSING.value,
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+            ))
+            try:
+                await db.commit()
+                return None
+            except IntegrityError:
+                await db.rollback()
+            existing = await db.get(IdempotencyKey, (user_id, endpoint, key), populate_existing=True)
+            if existing is not None:
+                return existing
+
+
+async def _complete(ident: Ident, status_code: int, body: bytes):
+    async with AsyncSessionLocal() as db:
+        record = await db.get(IdempotencyKey, ident)
+        if record is not None:
+            record.status = IdempotencyStatus.COMPLETED.value
+            record.response_status = status_code
+            record.response_body = body.decode("utf-8")
+            record.expires_at = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            await db.commit()
+
+
+async def _release(ident: Ident):
+    # Falha do servidor: libera a chave para o retry do cliente tentar de novo.
+    user_id, endpoint, key = ident
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id, IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key
+            )
+        )
+        await db.commit()
+
+
+async def purge_expired() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return result.rowcount
+
+
+class IdempotencyMiddleware:
+    # Header Idempotency-Key nas rotas de IDEMPOTENT_ENDPOINTS: a primeira
+    # requisicao com a chave processa e tem a resposta guardada; repeticoes
+    # recebem a mesma resposta sem executar nada, e duplicatas concorrentes
+    # esperam a primeira terminar. Respostas 5xx nao ficam guardadas.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in IDEMPOTENT_ENDPOINTS:
+            await self.app(scope, receive, send)
+            return
+
+        key = header(scope, b"idempotency-key")
+        payload = bearer_payload(scope) if key else None
+        if payload is not None:
+            await token_revocations.ensure_fresh()
+            if token_revocations.is_revoked(payload):
+                payload = None
+        user_id = token_user_id(payload)
+        if user_id is None:
+            # Sem chave ou sem token valido (ou revogado): segue normal, a rota responde o 401.
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await send_error(send, 400, "Idempotency-Key invalida")
+            return
+
+        body = await read_body(receive)
+        request_hash = hashlib.sha256(body).hexdigest()
+        ident = (user_id, f"{scope['method']} {scope['path']}", key)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            existing = await _claim(ident, request_hash)
+            if existing is None:
+                break
+            if existing.request_hash != request_hash:
+                await send_error(send, 422, "Idempotency-Key ja usada com outro corpo")
+                return
+            if existing.status == IdempotencyStatus.COMPLETED.value:
+                await send_json(
+                    send, existing.response_status, existing.response_body.encode("utf-8"),
+                    [(b"idempotent-replayed", b"true")]
+                )
+                return
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                await send_error(send, 409, "Requisicao com esta Idempotency-Key em andamento", [(b"retry-after", b"1")])
+                return
+            event = _in_flight.get(ident)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(POLL_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+        await self._process(scope, receive, send, ident, body)
+
+    async def _process(self, scope, receive, send, ident: Ident, body: bytes):
+        done = _in_flight[ident] = asyncio.Event()
+        status_code = 500
+        chunks = []
+
+        async def send_and_capture(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body(body, receive), send_and_capture)
+        except BaseException:
+            await _release(ident)
+            raise
+        else:
+            if status_code >= 500:
+                await _release(ident)
+            else:
+                await _complete(ident, status_code, b"".join(chunks))
+        finally:
+            _in_flight.pop(ident, None)
+            done.set()
@@ -0,0 +1,163 @@
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import BatchOrderCreate, OrderItemCreate
+from app.services.stats_counters import bump, order_status_deltas
+
+logger = logging.getLogger(__name__)
+
+
+def merge_quantities(items: Iterable[OrderItemCreate]) -> Dict[int, int]:
+    quantities = {}
+    for item_data in items:
+        quantities[item_data.product_id] = quantities.get(item_data.product_id, 0) + item_data.quantity
+    return quantities
+
+
+def missing_products_detail(missing: List[int]) -> str:
+    if len(missing) == 1:
+        return f"Produto {missing[0]} nao encontrado"
+    return f"Produtos {', '.join(str(product_id) for product_id in missing)} nao encontrados"
+
+
+def price_items(quantities: Dict[int, int], products: dict, person_type: str) -> Tuple[List[dict], Decimal]:
+    # products: id -> objeto com name, price_pf e price_pj (modelo ou linha de SELECT).
+    subtotal = Decimal("0")
+    items = []
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        unit_price = product.price_pj if person_type == "pj" else product.price_pf
+        total_price = unit_price * quantity
+        items.append({
+            "product_id": product_id,
+            "product_name": product.name,
+            "quantity": quantity,
+            "unit_price": unit_price,
+            "total_price": total_price
+        })
+        subtotal += total_price
+    return items, subtotal
+
+
+async def create_order_batch(db: AsyncSession, orders: List[BatchOrderCreate]) -> List[dict]:
+    # Usuarios e produtos de todo o lote em duas consultas; os pedidos validos
+    # sao gravados em blocos de ORDER_BATCH_CHUNK_SIZE, cada bloco numa
+    # transacao com um INSERT multi-row de pedidos (RETURNING id) e um de itens.
+    # Um bloco que falha no banco marca so os seus pedidos com erro.
+    results: List[dict] = [{"index": index} for index in range(len(orders))]
+
+    user_ids = {data.user_id for data in orders}
+    product_ids = {item.product_id for data in orders for item in data.items}
+    users = {
+        row.id: row
+        for row in await db.execute(select(User.id, User.person_type, User.is_active).where(User.id.in_(user_ids)))
+    }
+    products = {
+        row.id: row
+        for row in await db.execute(
+            select(Product.id, Product.name, Product.price_pf, Product.price_pj)
+            .where(Product.id.in_(product_ids), Product.is_active == True)
+        )
+    } if product_ids else {}
+
+    pending = []
+    for index, data in enumerate(orders):
+        user = users.get(data.user_id)
+        if user is None:
+            results[index]["error"] = "Usuario nao encontrado"
+            continue
+        if not user.is_active:
+            results[index]["error"] = "Usuario desativado"
+            continue
+
+        quantities = merge_quantities(data.items)
+        missing = [product_id for product_id in quantities if product_id not in products]
+        if missing:
+            results[index]["error"] = missing_products_detail(missing)
+            continue
+
+        person_type = data.person_type or user.person_type or "pf"
+        items, subtotal = price_items(quantities, products, person_type)
+        order = {
+            "user_id": data.user_id,
+            "status": "pending",
+            "person_type": person_type,
+            "subtotal": subtotal,
+            "total": subtotal,
+            "notes": data.notes
+        }
+        pending.append((index, order, items))
+
+    chunk_size = settings.ORDER_BATCH_CHUNK_SIZE
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            order_ids = (await db.scalars(
+                insert(Order).returning(Order.id, sort_by_parameter_order=True),
+                [order for _, order, _ in chunk]
+            )).all()
+            item_rows = [
+                {**item, "order_id": order_id}
+                for order_id, (_, _, items) in zip(order_ids, chunk)
+                for item in items
+            ]
+            if item_rows:
+                await db.execute(insert(OrderItem), item_rows)
+            await bump(db, total_orders=len(chunk), pending_orders=len(chunk))
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            logger.exception("Falha ao gravar bloco de pedidos do lote")
+            for index, _, _ in chunk:
+                results[index]["error"] = "Erro ao gravar pedido"
+            continue
+
+        for order_id, (index, order, _) in zip(order_ids, chunk):
+            results[index].update(order_id=order_id, total=order["total"])
+
+    return results
+
+
+def status_change_values(new_status: str, now: datetime) -> dict:
+    # Carimbos da mudanca de status; o primeiro paid_at/completed_at vale.
+    values = {"status": new_status}
+    if new_status == "paid":
+        values["paid_at"] = func.coalesce(Order.paid_at, now)
+    elif new_status == "completed":
+        values["completed_at"] = func.coalesce(Order.completed_at, now)
+    return values
+
+
+async def bulk_update_order_status(db: AsyncSession, order_ids: List[int], new_status: str) -> List[int]:
+    # Um UPDATE ... WHERE id IN (...) RETURNING para todos os pedidos. Com os
+    # contadores de stats ligados, os status antigos sao lidos antes com
+    # FOR UPDATE (o RETURNING so devolve o valor novo) e viram um unico bump.
+    old_status = {}
+    if settings.STATS_COUNTERS_ENABLED:
+        old_status = dict((await db.execute(
+            select(Order.id, Order.status).where(Order.id.in_(order_ids)).order_by(Order.id).with_for_update()
+        )).all())
+
+    rows = (await db.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids))
+        .values(**status_change_values(new_status, datetime.utcnow()))
+        .returning(Order.id, Order.total)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    deltas: Dict[str, object] = {}
+    for order_id, total in rows:
+        for name, delta in order_status_deltas(old_status.get(order_id), new_status, total).items():
+            deltas[name] = deltas.get(name, 0) + delta
+    await bump(db, **deltas)
+    await db.commit()
+    return sorted(order_id for order_id, _ in rows)
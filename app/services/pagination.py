@@ -0,0 +1,72 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, String, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.types import TypeDecorator
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class CursorDateTime(TypeDecorator):
+    # No SQLite o DateTime e texto e a comparacao e de texto: o CURRENT_TIMESTAMP
+    # do server_default grava '2026-01-01 10:00:00' e o SQLAlchemy grava
+    # '2026-01-01 10:00:00.123456'. O cursor vai no formato da linha de onde
+    # saiu (sem fracao quando ela e zero); com o '.000000' padrao, linhas do
+    # mesmo segundo voltariam na pagina seguinte.
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None:
+            return value.strftime("%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S")
+        return value
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor invalido")
+
+
+def keyset_statement(stmt, model, limit: int, cursor: Optional[str]):
+    # Ordena por (created_at, id) decrescente e busca limit + 1 linhas
+    # para saber se existe proxima pagina sem precisar de COUNT.
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            tuple_(model.created_at, model.id) < tuple_(literal(created_at, CursorDateTime()), row_id)
+        )
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def _split_page(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+async def keyset_rows(db: AsyncSession, stmt, model, limit: int, cursor: Optional[str] = None):
+    # Paginacao por cursor de selects de colunas: devolve as tuplas, que
+    # precisam incluir created_at e id para montar o cursor.
+    rows = (await db.execute(keyset_statement(stmt, model, limit, cursor))).all()
+    return _split_page(rows, limit)
@@ -0,0 +1,119 @@
+import asyncio
+import random
+import time
+import uuid
+from typing import Optional
+import httpx
+from app.config import settings
+from app.services.metrics import mp_request_duration
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class MercadoPagoClient:
+    # Cliente HTTP do Mercado Pago sobre um httpx.AsyncClient compartilhado
+    # (keep-alive). Devolve o mesmo formato do SDK oficial:
+    # {"status": <http status>, "response": <json>}.
+    def __init__(
+        self,
+        access_token: str,
+        base_url: str = "https://api.mercadopago.com",
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+        max_retries: int = 2,
+        backoff: float = 0.2,
+        max_connections: int = 50,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {access_token}"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def _sleep_before_retry(self, attempt: int):
+        # Backoff exponencial com "full jitter" para nao sincronizar retries.
+        await asyncio.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    async def _request(self, operation: str, method: str, path: str, json: Optional[dict] = None,
+                       headers: Optional[dict] = None, retry: bool = False, timeout: Optional[float] = None) -> dict:
+        attempts = self.max_retries + 1 if retry else 1
+        request_timeout = timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT
+
+        for attempt in range(attempts):
+            last_attempt = attempt + 1 == attempts
+            # Cada tentativa e medida separadamente, com o resultado dela.
+            started = time.perf_counter()
+            try:
+                response = await self._client.request(method, path, json=json, headers=headers, timeout=request_timeout)
+            except httpx.TimeoutException:
+                mp_request_duration.observe((operation, "timeout"), time.perf_counter() - started)
+                if last_attempt:
+                    return {"status": 504, "response": {"message": "Timeout ao comunicar com o Mercado Pago"}}
+            except httpx.TransportError:
+                mp_request_duration.observe((operation, "error"), time.perf_counter() - started)
+                if last_attempt:
+                    return {"status": 502, "response": {"message": "Falha ao comunicar com o Mercado Pago"}}
+            else:
+                mp_request_duration.observe((operation, str(response.status_code)), time.perf_counter() - started)
+                if response.status_code not in RETRYABLE_STATUS or last_attempt:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        body = {}
+                    return {"status": response.status_code, "response": body}
+
+            await self._sleep_before_retry(attempt)
+
+    async def create_preference(self, data: dict, timeout: Optional[float] = None) -> dict:
+        # Sem chave de idempotencia na API de preferencias: nao repete.
+        return await self._request("create_preference", "POST", "/checkout/preferences", json=data, timeout=timeout)
+
+    async def create_payment(self, data: dict, idempotency_key: Optional[str] = None,
+                             timeout: Optional[float] = None) -> dict:
+        # O X-Idempotency-Key e o mesmo em todas as tentativas, entao o retry
+        # nunca gera uma segunda cobranca.
+        headers = {"X-Idempotency-Key": idempotency_key or str(uuid.uuid4())}
+        return await self._request(
+            "create_payment", "POST", "/v1/payments", json=data, headers=headers, retry=True, timeout=timeout
+        )
+
+    async def get_payment(self, payment_id, timeout: Optional[float] = None) -> dict:
+        return await self._request("get_payment", "GET", f"/v1/payments/{payment_id}", retry=True, timeout=timeout)
+
+
+_client: Optional[MercadoPagoClient] = None
+
+
+def get_payment_gateway() -> MercadoPagoClient:
+    global _client
+    if _client is None:
+        _client = MercadoPagoClient(
+            settings.MP_ACCESS_TOKEN,
+            base_url=settings.MP_API_BASE_URL,
+            timeout=settings.MP_TIMEOUT_SECONDS,
+            connect_timeout=settings.MP_CONNECT_TIMEOUT_SECONDS,
+            max_retries=settings.MP_MAX_RETRIES,
+            max_connections=settings.MP_MAX_CONNECTIONS
+        )
+    return _client
+
+
+def set_payment_gateway(client: Optional[MercadoPagoClient]):
+    # Permite apontar para um servidor MP falso (testes e benchmarks).
+    global _client
+    _client = client
+
+
+async def close_payment_gateway():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, Optional, Set
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = {"approved", "rejected", "cancelled", "refunded", "charged_back"}
+
+
+class PaymentNotifier:
+    # Acorda as conexoes SSE que esperam a mudanca de status de um pedido.
+    # Os assinantes sao sempre locais; o backend decide como a publicacao
+    # chega aos outros processos.
+    def __init__(self, backend: Optional["NotifierBackend"] = None):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self.backend = backend or MemoryBackend()
+
+    def subscribe(self, order_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=8)
+        self._subscribers[order_id].add(queue)
+        return queue
+
+    def unsubscribe(self, order_id: int, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(order_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[order_id]
+
+    def dispatch(self, order_id: int, status: str):
+        for queue in self._subscribers.get(order_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    async def publish(self, order_id: int, status: str):
+        # Chamar depois do commit, para ninguem ler um status que nao foi gravado.
+        try:
+            await self.backend.publish(self, order_id, status)
+        except Exception:
+            logger.exception("Falha ao publicar status do pedido %s", order_id)
+
+    async def start(self):
+        await self.backend.start(self)
+
+    async def stop(self):
+        await self.backend.stop()
+
+
+class NotifierBackend(ABC):
+    @abstractmethod
+    async def publish(self, notifier: PaymentNotifier, order_id: int, status: str):
+        ...
+
+    async def start(self, notifier: PaymentNotifier):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class MemoryBackend(NotifierBackend):
+    # So este processo: serve quando o webhook e processado no mesmo worker.
+    async def publish(self, notifier: PaymentNotifier, order_id: int, status: str):
+        notifier.dispatch(order_id, status)
+
+
+class PostgresBackend(NotifierBackend):
+    # LISTEN/NOTIFY do Postgres numa conexao dedicada: a publicacao de qualquer
+    # processo chega a todos os processos que escutam o canal.
+    channel = "payment_status"
+
+    def __init__(self, conninfo: str):
+        self.conninfo = conninfo
+        self._connection = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def _connect(self):
+        import psycopg
+
+        if self._connection is None or self._connection.closed:
+            self._connection = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+        return self._connection
+
+    async def publish(self, notifier: PaymentNotifier, order_id: int, status: str):
+        connection = await self._connect()
+        payload = json.dumps({"order_id": order_id, "status": status})
+        await connection.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+
+    async def start(self, notifier: PaymentNotifier):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(notifier))
+
+    async def _listen(self, notifier: PaymentNotifier):
+        import psycopg
+
+        while True:
+            try:
+                connection = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+                async with connection:
+                    await connection.execute(f"LISTEN {self.channel}")
+                    async for notify in connection.notifies():
+                        message = json.loads(notify.payload)
+                        notifier.dispatch(int(message["order_id"]), message["status"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Conexao LISTEN caiu; reconectando")
+                await asyncio.sleep(1)
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+def _build_backend() -> NotifierBackend:
+    if settings.PAYMENT_NOTIFIER_BACKEND == "postgres":
+        return PostgresBackend(settings.DATABASE_URL)
+    return MemoryBackend()
+
+
+payment_notifier = PaymentNotifier(_build_backend())
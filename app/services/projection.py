@@ -0,0 +1,72 @@
+from collections import defaultdict
+from typing import Generic, List, Optional, Sequence, Type, TypeVar
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.order import Order, OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.schemas.order import OrderItemResponse, OrderResponse
+from app.schemas.pagination import Page
+from app.schemas.product import ProductResponse
+from app.schemas.user import UserListResponse
+
+T = TypeVar("T", bound=BaseModel)
+
+
+class Projection(Generic[T]):
+    # Caminho de leitura sem ORM: seleciona so as colunas que o schema de
+    # resposta usa e valida as tuplas de uma vez com um TypeAdapter. Nao ha
+    # identity map nem objetos instrumentados, e o JSON sai direto do
+    # pydantic-core, sem a segunda validacao do response_model do FastAPI.
+    def __init__(self, schema: Type[T], model):
+        columns = model.__table__.columns
+        self.columns = [getattr(model, name) for name in schema.model_fields if name in columns]
+        self._list = TypeAdapter(List[schema])
+        self._page = TypeAdapter(Page[schema])
+
+    def select(self):
+        return select(*self.columns)
+
+    def validate(self, rows: Sequence) -> List[T]:
+        return self._list.validate_python(rows, from_attributes=True)
+
+    def list_response(self, rows: Sequence) -> Response:
+        return _json_response(self._list.dump_json(self.validate(rows)))
+
+    def page_response(self, rows: Sequence, next_cursor: Optional[str]) -> Response:
+        page = self._page.validate_python({"items": rows, "next_cursor": next_cursor}, from_attributes=True)
+        return _json_response(self._page.dump_json(page))
+
+
+def _json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+product_projection = Projection(ProductResponse, Product)
+user_projection = Projection(UserListResponse, User)
+order_projection = Projection(OrderResponse, Order)
+order_item_projection = Projection(OrderItemResponse, OrderItem)
+
+
+async def with_order_items(db: AsyncSession, rows: Sequence) -> List[dict]:
+    # Equivalente ao selectinload(Order.items): uma consulta para os itens de
+    # todos os pedidos da pagina, agrupados em memoria.
+    orders = [dict(row._mapping) for row in rows]
+    if not orders:
+        return orders
+
+    items = defaultdict(list)
+    item_rows = await db.execute(
+        order_item_projection.select()
+        .add_columns(OrderItem.order_id.label("item_order_id"))
+        .where(OrderItem.order_id.in_([order["id"] for order in orders]))
+        .order_by(OrderItem.id)
+    )
+    for item in item_rows:
+        items[item.item_order_id].append(item)
+
+    for order in orders:
+        order["items"] = items.get(order["id"], [])
+    return orders
@@ -0,0 +1,83 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from sqlalchemy import event
+from app.database import async_engine, replica_async_engine
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(bind=async_engine.sync_engine):
+    # Escuta o engine inteiro enquanto o bloco roda, entao funciona mesmo quando
+    # a requisicao e executada em outra thread (TestClient, threadpool do Starlette).
+    counter = QueryCounter()
+    event.listen(bind, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", counter._on_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, bind=async_engine.sync_engine):
+    with count_queries(bind) as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(counter.statements)
+        raise AssertionError(f"Esperado no maximo {limit} queries, executadas {counter.count}:\n{statements}")
+
+
+_request_counter: ContextVar[Optional[QueryCounter]] = ContextVar("request_query_counter", default=None)
+
+
+def _count_request_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _request_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+def install_request_query_counter(bind=async_engine.sync_engine):
+    if not event.contains(bind, "before_cursor_execute", _count_request_query):
+        event.listen(bind, "before_cursor_execute", _count_request_query)
+
+
+class QueryCountMiddleware:
+    # Diagnostico (benchmarks): devolve no header X-DB-Queries quantas queries a
+    # requisicao executou ate o inicio da resposta. O contador vive num
+    # ContextVar, entao requisicoes concorrentes nao se misturam.
+    def __init__(self, app):
+        self.app = app
+        install_request_query_counter()
+        if replica_async_engine is not None:
+            install_request_query_counter(replica_async_engine.sync_engine)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = QueryCounter()
+        token = _request_counter.set(counter)
+
+        async def send_with_count(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(counter.count).encode("ascii")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_count)
+        finally:
+            _request_counter.reset(token)
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from app.config import settings
+from app.services.asgi import bearer_user_id, header, read_body, replay_body, send_error
+from app.services.metrics import rate_limited_requests_total
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+SCOPES = ("ip", "user", "email")
+
+
+@dataclass(frozen=True)
+class Rule:
+    # Token bucket: ate `capacity` requisicoes de uma vez, repostas a `rate` por segundo.
+    scope: str
+    capacity: float
+    rate: float
+
+
+def parse_rule(scope: str, spec: str) -> Rule:
+    # "5/minute" -> 5 requisicoes de rajada, 5 por minuto de reposicao.
+    if scope not in SCOPES:
+        raise ValueError(f"Escopo de rate limit invalido: {scope}")
+    count, _, period = spec.partition("/")
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Limite invalido: {spec}")
+    return Rule(scope, float(count), int(count) / PERIODS[period])
+
+
+def parse_rules(config: Dict[str, Dict[str, str]]) -> Dict[str, List[Rule]]:
+    return {route: [parse_rule(scope, spec) for scope, spec in limits.items()] for route, limits in config.items()}
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        # Tira uma ficha do balde; devolve 0 se passou ou os segundos ate a proxima ficha.
+        ...
+
+
+class MemoryBackend(RateLimitBackend):
+    # So este processo: com N workers o limite efetivo e N vezes o configurado.
+    # Nao ha await no meio, entao cada take e atomico no event loop.
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [capacity, now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+
+_REFILL = (
+    "LEAST(CAST(:capacity AS double precision), b.tokens + "
+    "GREATEST(0, EXTRACT(EPOCH FROM now() - b.updated_at)) * CAST(:rate AS double precision))"
+)
+TAKE_SQL = text(f"""
+    INSERT INTO rate_limit_buckets AS b (key, tokens, allowed, updated_at)
+    VALUES (:key, CAST(:capacity AS double precision) - 1, true, now())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = {_REFILL} - CASE WHEN {_REFILL} >= 1 THEN 1 ELSE 0 END,
+        allowed = {_REFILL} >= 1,
+        updated_at = now()
+    RETURNING tokens, allowed
+""")
+
+
+class PostgresBackend(RateLimitBackend):
+    # Baldes compartilhados entre processos na tabela rate_limit_buckets
+    # (UNLOGGED): um UPSERT por regra, com o relogio do banco. Baldes parados
+    # sao apagados por `python -m app.cli purge-rate-limits`.
+    async def take(self, key: str, capacity: float, rate: float) -> float:
+        from app.database import async_engine
+
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        async with async_engine.begin() as connection:
+            row = (await connection.execute(TAKE_SQL, {"key": digest, "capacity": capacity, "rate": rate})).one()
+        if row.allowed:
+            return 0.0
+        return (1 - row.tokens) / rate
+
+
+async def purge_idle_buckets(max_idle_seconds: int = 86400) -> int:
+    from app.database import async_engine
+
+    async with async_engine.begin() as connection:
+        result = await connection.execute(
+            text("DELETE FROM rate_limit_buckets WHERE updated_at < now() - make_interval(secs => :seconds)"),
+            {"seconds": max_idle_seconds}
+        )
+    return result.rowcount
+
+
+class RateLimiter:
+    def __init__(self, rules: Dict[str, List[Rule]], backend: RateLimitBackend):
+        self.rules = rules
+        self.backend = backend
+
+    async def check(self, route: str, identities: Dict[str, Optional[str]]) -> float:
+        for rule in self.rules.get(route, ()):
+            value = identities.get(rule.scope)
+            if value is None:
+                continue
+            try:
+                retry_after = await self.backend.take(f"{route}|{rule.scope}|{value}", rule.capacity, rule.rate)
+            except Exception:
+                # Backend fora do ar nao derruba login nem pagamento: deixa passar.
+                logger.exception("Falha no backend de rate limit")
+                return 0.0
+            if retry_after > 0:
+                rate_limited_requests_total.inc((route, rule.scope))
+                return retry_after
+        return 0.0
+
+
+def client_ip(scope) -> Optional[str]:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = header(scope, b"x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+def _email(body: bytes) -> Optional[str]:
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) else None
+
+
+class RateLimitMiddleware:
+    # Roda antes de qualquer dependencia, banco ou bcrypt: o 429 custa um
+    # decode de JWT (escopo "user") ou um json.loads do corpo (escopo "email").
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or rate_limiter
+
+    async def __call__(self, scope, receive, send):
+        route = f"{scope['method']} {scope['path']}" if scope["type"] == "http" else None
+        rules = self.limiter.rules.get(route)
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        scopes = {rule.scope for rule in rules}
+        identities = {"ip": client_ip(scope)}
+        if "user" in scopes:
+            user_id = bearer_user_id(scope)
+            identities["user"] = str(user_id) if user_id is not None else None
+        if "email" in scopes:
+            body = await read_body(receive)
+            receive = replay_body(body, receive)
+            identities["email"] = _email(body)
+
+        retry_after = await self.limiter.check(route, identities)
+        if retry_after > 0:
+            await send_error(
+                send, 429, "Muitas tentativas, tente novamente em instantes",
+                [(b"retry-after", str(math.ceil(retry_after)).encode("ascii"))]
+            )
+            return
+        await self.app(scope, receive, send)
+
+
+def _build_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "postgres":
+        return PostgresBackend()
+    return MemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limiter = RateLimiter(parse_rules(settings.RATE_LIMITS), _build_backend())
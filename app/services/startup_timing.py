@@ -0,0 +1,36 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+logger = logging.getLogger("app.startup")
+
+
+class StartupTimer:
+    # Mede as fases do cold start (imports e init do lifespan). Mantido sem
+    # dependencias pesadas para poder ser importado antes de todo o resto.
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def report(self) -> dict:
+        return {
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "phases": [{"name": name, "ms": round(ms, 1)} for name, ms in self.phases]
+        }
+
+    def log(self):
+        report = self.report()
+        details = ", ".join(f"{phase['name']}={phase['ms']}ms" for phase in report["phases"])
+        logger.info("startup %sms: %s", report["total_ms"], details)
+
+
+startup_timer = StartupTimer()
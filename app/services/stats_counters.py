@@ -0,0 +1,109 @@
+from decimal import Decimal
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.order import Order
+from app.models.product import Product
+from app.models.stats import StatsCounter
+from app.models.user import User
+
+COUNTERS = ("total_users", "total_orders", "paid_orders", "pending_orders", "total_revenue")
+
+
+def _active_products():
+    return select(func.count(Product.id)).where(Product.is_active == True).scalar_subquery()
+
+
+def _format(values: dict) -> dict:
+    return {
+        "total_users": int(values["total_users"]),
+        "total_orders": int(values["total_orders"]),
+        "paid_orders": int(values["paid_orders"]),
+        "pending_orders": int(values["pending_orders"]),
+        "total_products": int(values["total_products"]),
+        "total_revenue": float(values["total_revenue"])
+    }
+
+
+async def compute_stats(db: AsyncSession) -> dict:
+    # Uma unica varredura de orders com agregacao condicional; users e products
+    # entram como subqueries escalares na mesma consulta.
+    row = (await db.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery().label("total_users"),
+            func.count(Order.id).label("total_orders"),
+            func.count(case((Order.status == "paid", 1))).label("paid_orders"),
+            func.count(case((Order.status == "pending", 1))).label("pending_orders"),
+            _active_products().label("total_products"),
+            func.coalesce(func.sum(case((Order.status == "paid", Order.total))), 0).label("total_revenue")
+        ).select_from(Order)
+    )).one()
+    return _format(row._mapping)
+
+
+async def rebuild_counters(db: AsyncSession) -> dict:
+    stats = await compute_stats(db)
+    await db.execute(delete(StatsCounter))
+    db.add_all([StatsCounter(name=name, value=stats[name]) for name in COUNTERS])
+    await db.commit()
+    return stats
+
+
+async def read_stats(db: AsyncSession) -> dict:
+    if not settings.STATS_COUNTERS_ENABLED:
+        return await compute_stats(db)
+
+    stmt = select(StatsCounter.name, StatsCounter.value, _active_products())
+    rows = (await db.execute(stmt)).all()
+    if len(rows) < len(COUNTERS):
+        # Semeia no primario: db pode ser a replica, e totais atrasados virariam
+        # a base dos contadores.
+        async with AsyncSessionLocal() as primary:
+            try:
+                return await rebuild_counters(primary)
+            except IntegrityError:
+                # Outra requisicao semeou a tabela ao mesmo tempo.
+                await primary.rollback()
+                rows = (await primary.execute(stmt)).all()
+
+    values = {name: value for name, value, _ in rows}
+    values["total_products"] = rows[0][2]
+    return _format(values)
+
+
+async def bump(db: AsyncSession, **deltas):
+    # Aplica todos os deltas num unico UPDATE dentro da transacao da requisicao.
+    if not settings.STATS_COUNTERS_ENABLED:
+        return
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    await db.execute(
+        update(StatsCounter)
+        .where(StatsCounter.name.in_(list(deltas)))
+        .values(value=StatsCounter.value + case(deltas, value=StatsCounter.name))
+    )
+
+
+async def record_user_registered(db: AsyncSession):
+    await bump(db, total_users=1)
+
+
+async def record_order_created(db: AsyncSession, status: str, total):
+    await bump(db, total_orders=1, **order_status_deltas(None, status, total))
+
+
+async def record_order_status_change(db: AsyncSession, old_status: str, new_status: str, total):
+    if old_status != new_status:
+        await bump(db, **order_status_deltas(old_status, new_status, total))
+
+
+def order_status_deltas(old_status, new_status, total) -> dict:
+    paid = (new_status == "paid") - (old_status == "paid")
+    return {
+        "paid_orders": paid,
+        "pending_orders": (new_status == "pending") - (old_status == "pending"),
+        "total_revenue": Decimal(total or 0) * paid
+    }
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.revoked_token import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Linhas gravadas por outro processo podem aparecer com revoked_at um pouco
+# anterior ao ultimo sync (commit atrasado): cada sync rele esta janela.
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    # Sem falso negativo: "nao esta" e definitivo e dispensa olhar o dict.
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _epoch(value: datetime) -> float:
+    # Datetime sem fuso seria lido no fuso local do processo.
+    if value.tzinfo is None:
+        raise ValueError("Datetime sem fuso horario")
+    return value.timestamp()
+
+
+class TokenRevocations:
+    # Copia em memoria da tabela revoked_tokens: a checagem no get_current_user
+    # e um Bloom filter (quase sempre "nao esta") e, so no acerto, um dict.
+    # Cada processo le as revogacoes novas do banco a cada
+    # TOKEN_REVOCATION_SYNC_SECONDS, em segundo plano; as feitas no proprio
+    # processo valem na hora.
+    def __init__(self, capacity: int, error_rate: float, sync_seconds: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_seconds = sync_seconds
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, float] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._synced_until: Optional[datetime] = None
+        self._next_sync = 0.0
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, payload: dict) -> bool:
+        jti = payload.get("jti")
+        if jti and jti in self._bloom and jti in self._tokens:
+            return True
+        try:
+            revoked_at = self._users.get(int(payload.get("sub")))
+        except (TypeError, ValueError):
+            return False
+        return revoked_at is not None and payload.get("iat", 0) <= revoked_at
+
+    async def ensure_fresh(self):
+        # So a primeira carga do processo espera o banco; depois o sync roda
+        # em segundo plano e a requisicao segue com o que ja esta em memoria.
+        if self._synced_until is None:
+            async with self._sync_lock:
+                if self._synced_until is None:
+                    await self._sync()
+        elif time.monotonic() >= self._next_sync and (self._sync_task is None or self._sync_task.done()):
+            self._sync_task = asyncio.create_task(self._sync())
+
+    async def _sync(self):
+        self._next_sync = time.monotonic() + self.sync_seconds
+        started = datetime.now(timezone.utc)
+        stmt = select(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at, RevokedToken.expires_at).where(
+            RevokedToken.expires_at > started
+        )
+        if self._synced_until is not None:
+            stmt = stmt.where(RevokedToken.revoked_at >= self._synced_until - SYNC_OVERLAP)
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = (await db.execute(stmt)).all()
+        except Exception:
+            logger.exception("Falha ao sincronizar tokens revogados")
+            return
+        for row in rows:
+            self._remember(row.jti, row.user_id, _epoch(row.revoked_at), _epoch(row.expires_at))
+        self._synced_until = started
+        self._prune()
+
+    def _remember(self, jti: Optional[str], user_id: int, revoked_at: float, expires_at: float):
+        if jti:
+            self._tokens[jti] = expires_at
+            self._bloom.add(jti)
+        else:
+            self._users[user_id] = max(revoked_at, self._users.get(user_id, 0.0))
+
+    def _prune(self):
+        now = time.time()
+        lifetime = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        expired = [jti for jti, expires_at in self._tokens.items() if expires_at <= now]
+        for jti in expired:
+            del self._tokens[jti]
+        for user_id in [user_id for user_id, revoked_at in self._users.items() if revoked_at + lifetime <= now]:
+            del self._users[user_id]
+        if expired:
+            # Bloom filter nao remove: reconstroi com o que sobrou.
+            self._bloom = BloomFilter(max(self.capacity, len(self._tokens)), self.error_rate)
+            for jti in self._tokens:
+                self._bloom.add(jti)
+
+    async def revoke_token(self, db: AsyncSession, payload: dict):
+        # Logout: so este token, ate ele expirar.
+        now = datetime.now(timezone.utc)
+        expires_at = datetime.fromtimestamp(payload["exp"], timezone.utc)
+        db.add(RevokedToken(jti=payload["jti"], user_id=int(payload["sub"]), revoked_at=now, expires_at=expires_at))
+        await db.commit()
+        self._remember(payload["jti"], int(payload["sub"]), _epoch(now), _epoch(expires_at))
+
+    async def revoke_user(self, db: AsyncSession, user_id: int):
+        await self.revoke_users(db, [user_id])
+
+    async def revoke_users(self, db: AsyncSession, user_ids: List[int]):
+        # Todos os tokens ja emitidos para os usuarios; os proximos logins valem.
+        # O commit inclui o que mais estiver pendente na sessao.
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        db.add_all([RevokedToken(user_id=user_id, revoked_at=now, expires_at=expires_at) for user_id in user_ids])
+        await db.commit()
+        for user_id in user_ids:
+            self._remember(None, user_id, _epoch(now), _epoch(expires_at))
+
+
+async def purge_expired() -> int:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+        await db.commit()
+        return result.rowcount
+
+
+token_revocations = TokenRevocations(
+    settings.TOKEN_REVOCATION_BLOOM_CAPACITY, settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE,
+    settings.TOKEN_REVOCATION_SYNC_SECONDS
+)
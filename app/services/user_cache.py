@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    # Somente os campos que os handlers leem do usuario autenticado.
+    id: int
+    name: str
+    email: str
+    cpf: Optional[str]
+    person_type: str
+    is_active: bool
+    is_admin: bool
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            name=user.name,
+            email=user.email,
+            cpf=user.cpf,
+            person_type=user.person_type or "pf",
+            is_active=bool(user.is_active),
+            is_admin=bool(user.is_admin)
+        )
+
+
+class UserCache:
+    # LRU com TTL. Invalidacao explicita vale so para este processo; o TTL
+    # limita por quanto tempo outros workers enxergam o valor antigo.
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> Optional[UserPrincipal]:
+        with self._lock:
+            item = self._items.get(user_id)
+            if item is None:
+                return None
+            principal, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[user_id]
+                return None
+            self._items.move_to_end(user_id)
+            return principal
+
+    def set(self, principal: UserPrincipal):
+        with self._lock:
+            self._items[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+            self._items.move_to_end(principal.id)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._items.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.order import Order
+from app.models.payment import Payment
+from app.models.webhook import WebhookEvent, WebhookEventStatus
+from app.services.payment_gateway import get_payment_gateway
+from app.services.payment_notifier import payment_notifier
+from app.services.stats_counters import record_order_status_change
+
+logger = logging.getLogger(__name__)
+
+_drain_lock = asyncio.Lock()
+# Pedido de dreno que chegou com outro rodando: o dreno ativo faz mais uma volta.
+_rerun = False
+
+
+async def apply_payment_update(db: AsyncSession, mp_payment: dict) -> Optional[Order]:
+    external_reference = mp_payment.get("external_reference")
+    if not external_reference:
+        return None
+
+    order = await db.get(Order, int(external_reference))
+    if not order:
+        return None
+
+    payment = await db.scalar(select(Payment).where(Payment.order_id == order.id))
+    if not payment:
+        return None
+
+    payment.status = mp_payment["status"]
+
+    if mp_payment["status"] == "approved":
+        # Idempotente: notificacoes repetidas nao re-carimbam paid_at nem contam de novo.
+        await record_order_status_change(db, order.status, "paid", order.total)
+        order.status = "paid"
+        order.paid_at = order.paid_at or datetime.utcnow()
+        payment.paid_at = payment.paid_at or datetime.utcnow()
+
+    return order
+
+
+async def _claim_batch(db: AsyncSession, batch_size: int) -> Dict[Optional[str], List[int]]:
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=settings.WEBHOOK_CLAIM_TIMEOUT_SECONDS)
+    claimable = or_(
+        and_(
+            WebhookEvent.status == WebhookEventStatus.PENDING.value,
+            or_(WebhookEvent.next_attempt_at.is_(None), WebhookEvent.next_attempt_at <= now)
+        ),
+        and_(WebhookEvent.status == WebhookEventStatus.PROCESSING.value, WebhookEvent.claimed_at < stale)
+    )
+    # SKIP LOCKED deixa varios workers drenarem a fila sem disputar as mesmas linhas.
+    oldest = (
+        select(WebhookEvent.id)
+        .where(claimable)
+        .order_by(WebhookEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = (await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id.in_(oldest))
+        .values(status=WebhookEventStatus.PROCESSING.value, claimed_at=now, attempts=WebhookEvent.attempts + 1)
+        .returning(WebhookEvent.id, WebhookEvent.topic, WebhookEvent.resource_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    groups: Dict[Optional[str], List[int]] = defaultdict(list)
+    for event_id, topic, resource_id in claimed:
+        groups[resource_id if topic == "payment" else None].append(event_id)
+
+    # Coalescencia: notificacoes pendentes do mesmo pagamento que ficaram fora
+    # do lote sao reivindicadas junto, para o pagamento ser consultado uma vez.
+    payment_ids = [resource_id for resource_id in groups if resource_id is not None]
+    if payment_ids:
+        siblings = (await db.execute(
+            update(WebhookEvent)
+            .where(
+                WebhookEvent.status == WebhookEventStatus.PENDING.value,
+                WebhookEvent.topic == "payment",
+                WebhookEvent.resource_id.in_(payment_ids)
+            )
+            .values(status=WebhookEventStatus.PROCESSING.value, claimed_at=now, attempts=WebhookEvent.attempts + 1)
+            .returning(WebhookEvent.id, WebhookEvent.resource_id)
+            .execution_options(synchronize_session=False)
+        )).all()
+        for event_id, resource_id in siblings:
+            groups[resource_id].append(event_id)
+
+    await db.commit()
+    return groups
+
+
+async def _finish(db: AsyncSession, event_ids: List[int], error: Optional[str] = None):
+    if error is None:
+        values = {"status": WebhookEventStatus.PROCESSED.value, "processed_at": datetime.utcnow(), "last_error": None}
+        await db.execute(
+            update(WebhookEvent).where(WebhookEvent.id.in_(event_ids)).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return
+
+    # Volta para a fila ate esgotar as tentativas.
+    await db.execute(
+        update(WebhookEvent)
+        .where(WebhookEvent.id.in_(event_ids))
+        .values(
+            status=case(
+                (WebhookEvent.attempts >= settings.WEBHOOK_MAX_ATTEMPTS, WebhookEventStatus.FAILED.value),
+                else_=WebhookEventStatus.PENDING.value
+            ),
+            last_error=error,
+            claimed_at=None,
+            next_attempt_at=datetime.utcnow() + timedelta(seconds=settings.WEBHOOK_RETRY_DELAY_SECONDS)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def _process_payment(db: AsyncSession, payment_id: str) -> Optional[Tuple[int, str]]:
+    payment_info = await get_payment_gateway().get_payment(payment_id)
+    if payment_info["status"] != 200:
+        raise RuntimeError(f"Mercado Pago respondeu {payment_info['status']} para o pagamento {payment_id}")
+    order = await apply_payment_update(db, payment_info["response"])
+    return (order.id, payment_info["response"]["status"]) if order else None
+
+
+async def drain_once(batch_size: Optional[int] = None) -> int:
+    async with AsyncSessionLocal() as db:
+        groups = await _claim_batch(db, batch_size or settings.WEBHOOK_BATCH_SIZE)
+        if not groups:
+            return 0
+
+        for payment_id, event_ids in groups.items():
+            try:
+                change = await _process_payment(db, payment_id) if payment_id is not None else None
+                await _finish(db, event_ids)
+                await db.commit()
+                if change:
+                    await payment_notifier.publish(*change)
+            except Exception as exc:
+                logger.exception("Falha ao processar webhook do pagamento %s", payment_id)
+                await db.rollback()
+                await _finish(db, event_ids, error=str(exc))
+                await db.commit()
+
+        return sum(len(event_ids) for event_ids in groups.values())
+
+
+async def drain_webhook_inbox() -> int:
+    # Um dreno por processo. Quem chega com um rodando marca _rerun: o evento
+    # pode ter sido gravado depois da ultima consulta do dreno ativo, que entao
+    # da mais uma volta antes de soltar o lock.
+    global _rerun
+    if _drain_lock.locked():
+        _rerun = True
+        return 0
+    async with _drain_lock:
+        total = 0
+        while True:
+            _rerun = False
+            drained = await drain_once()
+            total += drained
+            if not drained and not _rerun:
+                return total
+
+
+class WebhookWorker:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # O intervalo e a janela de coalescencia: notificacoes repetidas que
+        # chegam nesse tempo viram uma unica consulta ao Mercado Pago.
+        while True:
+            try:
+                await drain_webhook_inbox()
+            except Exception:
+                logger.exception("Falha ao drenar a fila de webhooks")
+            await asyncio.sleep(self.interval)
+
+
+webhook_worker = WebhookWorker(settings.WEBHOOK_POLL_INTERVAL_SECONDS)
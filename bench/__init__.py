@@ -0,0 +1,8 @@
+# Credenciais dos usuarios criados pelo bench.seed, compartilhadas com o
+# bench.run sem importar o app (que le o DATABASE_URL no import).
+BENCH_PASSWORD = "bench-senha-123"
+ADMIN_EMAIL = "admin@bench.example.com"
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@bench.example.com"
@@ -0,0 +1,70 @@
+# Mercado Pago falso para o benchmark: responde os endpoints usados pelo
+# MercadoPagoClient com uma latencia fixa (BENCH_MP_LATENCY_MS), para a
+# medicao nao depender da rede nem do sandbox.
+# Para rodar sozinho: uvicorn bench.fake_mp:app --port 9100
+import asyncio
+import itertools
+import os
+import re
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_SECONDS = float(os.getenv("BENCH_MP_LATENCY_MS", "20")) / 1000
+
+# PNG 1x1 em base64, no lugar do QR Code real.
+QR_CODE_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+
+app = FastAPI()
+_ids = itertools.count(1_000_000)
+_payments = {}
+
+
+def _external_reference(body: dict) -> str:
+    if body.get("external_reference"):
+        return str(body["external_reference"])
+    match = re.search(r"#(\d+)", body.get("description", ""))
+    return match.group(1) if match else ""
+
+
+@app.post("/checkout/preferences")
+async def create_preference(request: Request):
+    await asyncio.sleep(LATENCY_SECONDS)
+    preference_id = f"pref-{next(_ids)}"
+    return JSONResponse(
+        {"id": preference_id, "init_point": f"http://fake-mp/{preference_id}", "sandbox_init_point": None},
+        status_code=201
+    )
+
+
+@app.post("/v1/payments")
+async def create_payment(request: Request):
+    await asyncio.sleep(LATENCY_SECONDS)
+    body = await request.json()
+    payment_id = next(_ids)
+    payment = {
+        "id": payment_id,
+        "status": "approved" if body.get("token") else "pending",
+        "external_reference": _external_reference(body),
+        "transaction_amount": body.get("transaction_amount")
+    }
+    _payments[payment_id] = payment
+    if body.get("payment_method_id") == "pix":
+        payment["point_of_interaction"] = {
+            "transaction_data": {"qr_code": f"00020126pix{payment_id}", "qr_code_base64": QR_CODE_BASE64}
+        }
+    return JSONResponse(payment, status_code=201)
+
+
+@app.get("/v1/payments/{payment_id}")
+async def get_payment(payment_id: int):
+    await asyncio.sleep(LATENCY_SECONDS)
+    payment = _payments.get(payment_id)
+    if payment is None:
+        return JSONResponse({"message": "Payment not found"}, status_code=404)
+    # Toda consulta depois da criacao ve o pagamento aprovado, como no webhook real.
+    return {**payment, "status": "approved"}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy"}
@@ -0,0 +1,138 @@
+# Confere o plano das consultas quentes e sai com erro se alguma cair em
+# varredura sequencial. Rode contra um banco com dados (o --seed APAGA e
+# repovoa o banco, como o bench.seed):
+#   DATABASE_URL=... python -m bench.plan_check --seed --users 2000 --orders 20000
+# No Postgres o EXPLAIN roda com enable_seqscan=off: se ainda assim aparece
+# Seq Scan, nenhum indice atende a consulta, seja qual for o tamanho da tabela.
+# Percorrer um indice inteiro sem condicao (so pela ordem) tambem conta como
+# varredura completa, exceto nas consultas de FULL_INDEX_SCAN_OK.
+import argparse
+import re
+import sys
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.database import engine
+from app.models import Order, OrderItem, Payment, Product, User, WebhookEvent
+from app.services.pagination import DEFAULT_PAGE_SIZE, encode_cursor, keyset_statement
+from app.services.projection import order_item_projection, order_projection, product_projection, user_projection
+
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?$")
+
+# O catalogo le o indice parcial de produtos ativos inteiro, de proposito.
+FULL_INDEX_SCAN_OK = {"catalog"}
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement, prefix: str):
+        self.statement = statement
+        self.prefix = prefix
+
+
+@compiles(Explain)
+def _compile_explain(element, compiler, **kw):
+    return f"{element.prefix} {compiler.process(element.statement, **kw)}"
+
+
+def hot_queries(conn):
+    user_id = conn.scalar(select(Order.user_id).order_by(Order.id).limit(1)) or 1
+    order_ids = conn.scalars(select(Order.id).order_by(Order.id).limit(DEFAULT_PAGE_SIZE)).all() or [1]
+    cursor = encode_cursor(datetime.utcnow(), 2 ** 31 - 1)
+
+    return {
+        "login": select(User).where(User.email == "user0@bench.example.com"),
+        "list_orders": order_projection.select()
+            .where(Order.user_id == user_id)
+            .order_by(Order.created_at.desc(), Order.id.desc()),
+        "order_items": order_item_projection.select().where(OrderItem.order_id.in_(order_ids)),
+        "get_order": select(Order).where(Order.id == order_ids[0], Order.user_id == user_id),
+        "catalog": product_projection.select().where(Product.is_active == True).order_by(Product.id),
+        "admin_orders": keyset_statement(order_projection.select(), Order, DEFAULT_PAGE_SIZE, cursor),
+        "admin_orders_by_status": keyset_statement(
+            order_projection.select().where(Order.status == "paid"), Order, DEFAULT_PAGE_SIZE, cursor
+        ),
+        "admin_users": keyset_statement(user_projection.select(), User, DEFAULT_PAGE_SIZE, cursor),
+        "admin_products": keyset_statement(product_projection.select(), Product, DEFAULT_PAGE_SIZE, cursor),
+        "payment_status": select(Payment).where(Payment.order_id == order_ids[0]),
+        "payment_by_mp_id": select(Payment.id).where(Payment.mp_payment_id == "500001"),
+        "webhook_claim": select(WebhookEvent.id)
+            .where(WebhookEvent.status == "pending")
+            .order_by(WebhookEvent.id)
+            .limit(100),
+    }
+
+
+def _postgres_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _postgres_nodes(child)
+
+
+def explain(conn, statement, full_index_scan_ok: bool = False):
+    # Devolve (linhas do plano, varreduras completas encontradas).
+    scans = []
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.execute(Explain(statement, "EXPLAIN (FORMAT JSON)")).scalar()[0]["Plan"]
+        lines = []
+        for node in _postgres_nodes(plan):
+            node_type, table, index = node["Node Type"], node.get("Relation Name"), node.get("Index Name")
+            lines.append(" ".join(part for part in (node_type, table, index, node.get("Index Cond")) if part))
+            if node_type == "Seq Scan":
+                scans.append(table)
+            elif node_type in ("Index Scan", "Index Only Scan") and "Index Cond" not in node and not full_index_scan_ok:
+                scans.append(f"{table} ({index})")
+        return lines, scans
+
+    lines = [row[-1] for row in conn.execute(Explain(statement, "EXPLAIN QUERY PLAN"))]
+    for match in filter(None, map(SQLITE_FULL_SCAN.match, lines)):
+        table, index = match.groups()
+        if index is None:
+            scans.append(table)
+        elif not full_index_scan_ok:
+            scans.append(f"{table} ({index})")
+    return lines, scans
+
+
+def check_plans(verbose: bool = False) -> int:
+    failures = 0
+    with engine.begin() as conn:
+        for name, statement in hot_queries(conn).items():
+            lines, scans = explain(conn, statement, name in FULL_INDEX_SCAN_OK)
+            ok = not scans
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}" + (f": varredura completa em {', '.join(scans)}" if scans else ""))
+            if verbose or not ok:
+                for line in lines:
+                    print(f"       {line}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.plan_check")
+    parser.add_argument("--seed", action="store_true", help="apaga e repovoa o banco antes (bench.seed)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--verbose", action="store_true", help="mostra o plano de todas as consultas")
+    args = parser.parse_args(argv)
+
+    if args.seed:
+        from bench.seed import seed
+
+        seed(args.users, args.products, args.orders)
+        if engine.dialect.name == "postgresql":
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.exec_driver_sql("ANALYZE")
+
+    failures = check_plans(args.verbose)
+    if failures:
+        print(f"{failures} consulta(s) com varredura completa", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Trava o numero de queries das listagens de pedidos: o mesmo numero com 1 ou
+# com muitos pedidos na pagina (sem N+1 nos itens). Roda a API em processo,
+# contra um SQLite temporario proprio (pip install -r bench/requirements.txt),
+# e sai com erro se alguma contagem mudar:
+#   python -m bench.query_check
+import os
+import sys
+import tempfile
+
+# Pedidos por usuario na segunda medicao; a primeira e com 1 pedido.
+MANY = 25
+
+# Queries esperadas com caches aquecidos: pedidos + itens (um IN para a pagina toda).
+EXPECTED = {
+    "GET /api/orders": 2,
+    "GET /api/admin/orders": 2,
+}
+
+
+def _setup_environment():
+    tmpdir = tempfile.mkdtemp(prefix="aprovafacil-query-check-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'query_check.sqlite')}"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    for name in ("DATABASE_REPLICA_URL", "STATS_COUNTERS_ENABLED", "VERCEL"):
+        os.environ.pop(name, None)
+
+
+def main() -> int:
+    _setup_environment()
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import update
+    from app.cli import main as cli
+    from app.database import SessionLocal
+    from app.models import User
+    from app.services.query_counter import count_queries
+    from bench import ADMIN_EMAIL, BENCH_PASSWORD
+
+    cli(["init-db"])
+    from api.index import app
+
+    client = TestClient(app)
+    client.post("/api/auth/register", json={"name": "Admin Bench", "email": ADMIN_EMAIL, "password": BENCH_PASSWORD})
+    with SessionLocal() as db:
+        db.execute(update(User).values(is_admin=True))
+        db.commit()
+    token = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": BENCH_PASSWORD}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    for index in range(2):
+        client.post(
+            "/api/admin/products",
+            json={"name": f"Produto {index}", "slug": f"produto-{index}", "price_pf": "10.00", "price_pj": "20.00"},
+            headers=headers
+        )
+
+    def create_orders(count: int):
+        for _ in range(count):
+            response = client.post(
+                "/api/orders", json={"items": [{"product_id": 1}, {"product_id": 2, "quantity": 2}]}, headers=headers
+            )
+            response.raise_for_status()
+
+    def measure() -> dict:
+        counts = {}
+        for route in EXPECTED:
+            path = route.split(" ", 1)[1]
+            client.get(path, headers=headers).raise_for_status()
+            with count_queries() as counter:
+                client.get(path, headers=headers).raise_for_status()
+            counts[route] = counter.count
+        return counts
+
+    create_orders(1)
+    few = measure()
+    create_orders(MANY - 1)
+    many = measure()
+
+    failures = 0
+    for route, expected in EXPECTED.items():
+        ok = few[route] == many[route] == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {route}: {few[route]} queries com 1 pedido, {many[route]} com {MANY}"
+              + ("" if ok else f" (esperado {expected})"))
+    return failures
+
+
+if __name__ == "__main__":
+    if main():
+        print("numero de queries mudou: confira se voltou algum lazy load (N+1)", file=sys.stderr)
+        sys.exit(1)
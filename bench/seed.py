@@ -0,0 +1,130 @@
+# Popula o banco do benchmark com volumes configuraveis. APAGA as tabelas do
+# DATABASE_URL informado: use sempre um banco descartavel.
+# Para rodar sozinho: DATABASE_URL=... python -m bench.seed --users 1000
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import insert
+from app.config import settings
+from bench import ADMIN_EMAIL, BENCH_PASSWORD, user_email
+from app.database import AsyncSessionLocal, Base, async_engine, engine
+from app.models import Order, OrderItem, Payment, Product, User
+from app.security import get_password_hash
+from app.services.stats_counters import rebuild_counters
+
+INSERT_CHUNK = 5000
+
+
+def _chunks(rows, size=INSERT_CHUNK):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(conn, model, rows):
+    for chunk in _chunks(rows):
+        conn.execute(insert(model), chunk)
+
+
+def seed(users: int, products: int, orders: int, random_seed: int = 42):
+    rng = random.Random(random_seed)
+    # Um hash so: bcrypt por usuario deixaria o seed mais lento que o benchmark.
+    password = get_password_hash(BENCH_PASSWORD)
+    now = datetime.utcnow()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    user_rows = [
+        {"id": 1, "name": "Admin Bench", "email": ADMIN_EMAIL, "password": password, "person_type": "pf",
+         "is_active": True, "is_admin": True, "created_at": now - timedelta(days=365)}
+    ]
+    for index in range(users):
+        user_rows.append({
+            "id": index + 2,
+            "name": f"Usuario {index}",
+            "email": user_email(index),
+            "password": password,
+            "person_type": "pj" if index % 5 == 0 else "pf",
+            "cpf": f"{index:011d}",
+            "is_active": True,
+            "is_admin": False,
+            "created_at": now - timedelta(minutes=rng.randint(0, 525600))
+        })
+
+    product_rows = [
+        {"id": index + 1, "name": f"Produto {index}", "slug": f"produto-{index}",
+         "description": f"Descricao do produto {index}", "price_pf": Decimal(rng.randint(50, 900)),
+         "price_pj": Decimal(rng.randint(100, 1800)), "is_active": True,
+         "created_at": now - timedelta(days=rng.randint(0, 365))}
+        for index in range(products)
+    ]
+
+    order_rows, item_rows, payment_rows = [], [], []
+    for order_id in range(1, orders + 1):
+        user = user_rows[rng.randint(1, len(user_rows) - 1)] if users else user_rows[0]
+        price_key = "price_pj" if user["person_type"] == "pj" else "price_pf"
+        chosen = rng.sample(product_rows, k=min(len(product_rows), rng.randint(1, 3)))
+        total = Decimal("0")
+        for product in chosen:
+            quantity = rng.randint(1, 2)
+            item_total = product[price_key] * quantity
+            total += item_total
+            item_rows.append({
+                "order_id": order_id, "product_id": product["id"], "product_name": product["name"],
+                "quantity": quantity, "unit_price": product[price_key], "total_price": item_total
+            })
+
+        created_at = now - timedelta(minutes=rng.randint(0, 525600))
+        status = rng.choices(["pending", "paid", "completed", "cancelled"], weights=[4, 3, 2, 1])[0]
+        paid_at = created_at + timedelta(minutes=5) if status in ("paid", "completed") else None
+        order_rows.append({
+            "id": order_id, "user_id": user["id"], "status": status, "person_type": user["person_type"],
+            "subtotal": total, "total": total, "created_at": created_at, "paid_at": paid_at,
+            "completed_at": paid_at + timedelta(days=7) if status == "completed" else None
+        })
+        if paid_at:
+            payment_rows.append({
+                "order_id": order_id, "mp_payment_id": str(500_000 + order_id), "method": "pix",
+                "status": "approved", "amount": total, "created_at": created_at, "paid_at": paid_at
+            })
+
+    with engine.begin() as conn:
+        _insert(conn, User, user_rows)
+        _insert(conn, Product, product_rows)
+        _insert(conn, Order, order_rows)
+        _insert(conn, OrderItem, item_rows)
+        _insert(conn, Payment, payment_rows)
+
+        if engine.dialect.name == "postgresql":
+            # Ids explicitos nao avancam as sequences; a API precisa delas.
+            for table in ("users", "products", "orders"):
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+                )
+
+
+async def rebuild_stats_counters():
+    # Com STATS_COUNTERS_ENABLED os contadores precisam refletir o seed.
+    async with AsyncSessionLocal() as db:
+        await rebuild_counters(db)
+    await async_engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.seed")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    seed(args.users, args.products, args.orders, args.seed)
+    if settings.STATS_COUNTERS_ENABLED:
+        asyncio.run(rebuild_stats_counters())
+    print(f"seed: {args.users} usuarios, {args.products} produtos, {args.orders} pedidos")
+
+
+if __name__ == "__main__":
+    main()
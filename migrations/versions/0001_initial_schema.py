@@ -0,0 +1,135 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 01:57:26.141658
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('slug', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price_pf', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('price_pj', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_products_id', 'products', ['id'], unique=False)
+    op.create_index('ix_products_slug', 'products', ['slug'], unique=True)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password', sa.String(length=255), nullable=False),
+    sa.Column('cpf', sa.String(length=14), nullable=True),
+    sa.Column('cnpj', sa.String(length=18), nullable=True),
+    sa.Column('phone', sa.String(length=20), nullable=True),
+    sa.Column('person_type', sa.String(length=2), nullable=True),
+    sa.Column('cep', sa.String(length=10), nullable=True),
+    sa.Column('street', sa.String(length=255), nullable=True),
+    sa.Column('number', sa.String(length=20), nullable=True),
+    sa.Column('complement', sa.String(length=255), nullable=True),
+    sa.Column('neighborhood', sa.String(length=255), nullable=True),
+    sa.Column('city', sa.String(length=255), nullable=True),
+    sa.Column('state', sa.String(length=2), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_admin', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_cnpj', 'users', ['cnpj'], unique=True)
+    op.create_index('ix_users_cpf', 'users', ['cpf'], unique=True)
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('person_type', sa.String(length=2), nullable=True),
+    sa.Column('subtotal', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('paid_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_id', 'orders', ['id'], unique=False)
+
+    op.create_table('order_items',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('product_name', sa.String(length=255), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=True),
+    sa.Column('unit_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('total_price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_order_items_id', 'order_items', ['id'], unique=False)
+
+    op.create_table('payments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('mp_payment_id', sa.String(length=100), nullable=True),
+    sa.Column('mp_preference_id', sa.String(length=100), nullable=True),
+    sa.Column('mp_external_reference', sa.String(length=100), nullable=True),
+    sa.Column('method', sa.String(length=20), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('pix_qr_code', sa.Text(), nullable=True),
+    sa.Column('pix_qr_code_base64', sa.Text(), nullable=True),
+    sa.Column('boleto_url', sa.String(length=500), nullable=True),
+    sa.Column('boleto_barcode', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('paid_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id')
+    )
+    op.create_index('ix_payments_id', 'payments', ['id'], unique=False)
+    op.create_index('ix_payments_mp_payment_id', 'payments', ['mp_payment_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_payments_mp_payment_id', table_name='payments')
+    op.drop_index('ix_payments_id', table_name='payments')
+    op.drop_table('payments')
+
+    op.drop_index('ix_order_items_id', table_name='order_items')
+    op.drop_table('order_items')
+
+    op.drop_index('ix_orders_id', table_name='orders')
+    op.drop_table('orders')
+
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_users_email', table_name='users')
+    op.drop_index('ix_users_cpf', table_name='users')
+    op.drop_index('ix_users_cnpj', table_name='users')
+    op.drop_table('users')
+
+    op.drop_index('ix_products_slug', table_name='products')
+    op.drop_index('ix_products_id', table_name='products')
+    op.drop_table('products')
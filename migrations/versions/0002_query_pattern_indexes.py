@@ -0,0 +1,51 @@
+"""query pattern indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 01:57:39.825218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (nome, tabela, colunas, opcoes)
+INDEXES = [
+    # Itens de uma pagina de pedidos (IN order_id) e o JOIN da exportacao.
+    ('ix_order_items_order_id', 'order_items', ['order_id'], {}),
+    # GET /api/orders: pedidos do cliente, mais recentes primeiro.
+    ('ix_orders_user_created', 'orders', ['user_id', 'created_at', 'id'], {}),
+    # Filtro por status do admin e contagens por status.
+    ('ix_orders_status_created', 'orders', ['status', 'created_at', 'id'], {}),
+    # Paginacao keyset (created_at, id) das listagens do admin.
+    ('ix_orders_created', 'orders', ['created_at', 'id'], {}),
+    ('ix_users_created', 'users', ['created_at', 'id'], {}),
+    ('ix_products_created', 'products', ['created_at', 'id'], {}),
+    # Catalogo publico: so produtos ativos, em ordem de id.
+    ('ix_products_active', 'products', ['id'], {
+        'postgresql_where': sa.text('is_active'),
+        'sqlite_where': sa.text('is_active = 1'),
+    }),
+]
+
+
+def upgrade():
+    # CONCURRENTLY no Postgres: cria os indices sem bloquear escritas nas
+    # tabelas grandes; exige rodar fora de transacao. IF NOT EXISTS cobre bancos
+    # criados pelo create_all, que ja trazem os indices declarados nos models.
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True, **options
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
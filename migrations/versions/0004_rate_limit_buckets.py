@@ -0,0 +1,34 @@
+"""rate limit buckets
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 02:31:40.117302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_rate_limit_buckets_updated_at', 'rate_limit_buckets', ['updated_at'], unique=False)
+    if op.get_bind().dialect.name == "postgresql":
+        # Estado descartavel: sem WAL, um crash so zera os baldes.
+        op.execute("ALTER TABLE rate_limit_buckets SET UNLOGGED")
+
+
+def downgrade():
+    op.drop_index('ix_rate_limit_buckets_updated_at', table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
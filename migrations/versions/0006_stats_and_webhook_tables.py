@@ -0,0 +1,54 @@
+"""stats counters and webhook inbox
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 03:40:12.318406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # IF NOT EXISTS: bancos criados pelo create_all depois dos contadores e do
+    # inbox de webhooks (e antes das migracoes) ja tem essas tabelas, mas sao
+    # carimbados em 0001 pelo init-db como os do schema original.
+    op.create_table('stats_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.PrimaryKeyConstraint('name'),
+    if_not_exists=True
+    )
+
+    op.create_table('webhook_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('topic', sa.String(length=50), nullable=True),
+    sa.Column('resource_id', sa.String(length=100), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('claimed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_webhook_events_id', 'webhook_events', ['id'], unique=False, if_not_exists=True)
+    op.create_index('ix_webhook_events_resource_id', 'webhook_events', ['resource_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_webhook_events_status', 'webhook_events', ['status'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_webhook_events_status', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_resource_id', table_name='webhook_events')
+    op.drop_index('ix_webhook_events_id', table_name='webhook_events')
+    op.drop_table('webhook_events')
+    op.drop_table('stats_counters')
@@ -0,0 +1,22 @@
+# Os testes rodam contra um SQLite temporario (precisa do aiosqlite):
+#   pip install -r tests/requirements.txt
+#   python -m pytest -q
+import os
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="aprovafacil-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'tests.sqlite')}"
+for name in ("DATABASE_REPLICA_URL", "STATS_COUNTERS_ENABLED", "VERCEL"):
+    os.environ.pop(name, None)
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    import app.models  # noqa: F401
+    from app.database import Base, engine
+
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
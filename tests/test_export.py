@@ -0,0 +1,23 @@
+import csv
+import io
+from decimal import Decimal
+from app.services.export import _csv_chunk, _ndjson_chunk
+
+
+def _parse(chunk: bytes):
+    return list(csv.reader(io.StringIO(chunk.decode("utf-8"))))
+
+
+def test_csv_neutralizes_formula_cells():
+    rows = [
+        (1, "=HYPERLINK(\"http://x\")", "+5511999999999", "-2+3", "@SUM(A1)", "\tx", "Ana"),
+    ]
+
+    assert _parse(_csv_chunk(rows)) == [
+        ["1", "'=HYPERLINK(\"http://x\")", "'+5511999999999", "'-2+3", "'@SUM(A1)", "'\tx", "Ana"],
+    ]
+
+
+def test_csv_keeps_numbers_and_ndjson_untouched():
+    assert _parse(_csv_chunk([(Decimal("-10.50"), None)])) == [["-10.50", ""]]
+    assert _ndjson_chunk(["name"], [("=1+1",)]) == b'{"name": "=1+1"}\n'
@@ -0,0 +1,26 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from app.database import AsyncSessionLocal
+from app.models.revoked_token import RevokedToken
+from app.services.token_revocation import TokenRevocations
+
+
+def test_user_cutoff_survives_the_database_round_trip():
+    # Outro processo so ve a revogacao pelo banco: o instante lido tem que ser
+    # o mesmo que foi gravado, para comparar com o iat dos tokens.
+    revoked_at = datetime(2030, 1, 1, 12, 0, 0, 250000, tzinfo=timezone.utc)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            db.add(RevokedToken(user_id=42, revoked_at=revoked_at, expires_at=revoked_at + timedelta(days=1)))
+            await db.commit()
+        other_process = TokenRevocations(1000, 0.01, 5)
+        await other_process.ensure_fresh()
+        return other_process
+
+    revocations = asyncio.run(scenario())
+
+    cutoff = revoked_at.timestamp()
+    assert revocations.is_revoked({"sub": "42", "iat": cutoff - 0.001})
+    assert revocations.is_revoked({"sub": "42", "iat": cutoff})
+    assert not revocations.is_revoked({"sub": "42", "iat": cutoff + 0.001})
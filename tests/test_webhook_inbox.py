@@ -0,0 +1,42 @@
+import asyncio
+from sqlalchemy import select
+from app.database import SessionLocal
+from app.models.webhook import WebhookEvent, WebhookEventStatus
+from app.services import webhook_inbox
+
+
+def _add_event(topic: str) -> int:
+    with SessionLocal() as db:
+        event = WebhookEvent(topic=topic, payload="{}")
+        db.add(event)
+        db.commit()
+        return event.id
+
+
+def _status(event_id: int) -> str:
+    with SessionLocal() as db:
+        return db.scalar(select(WebhookEvent.status).where(WebhookEvent.id == event_id))
+
+
+def test_event_committed_while_drain_is_finishing_is_processed(monkeypatch):
+    # O segundo evento chega depois da ultima consulta do dreno ativo, e o
+    # dreno disparado por ele encontra o lock ocupado.
+    real_drain_once = webhook_inbox.drain_once
+    late = {}
+
+    async def drain_once(batch_size=None):
+        drained = await real_drain_once(batch_size)
+        if not drained and not late:
+            late["id"] = _add_event("merchant_order")
+            late["concurrent"] = await webhook_inbox.drain_webhook_inbox()
+        return drained
+
+    monkeypatch.setattr(webhook_inbox, "drain_once", drain_once)
+    first = _add_event("merchant_order")
+
+    total = asyncio.run(webhook_inbox.drain_webhook_inbox())
+
+    assert late["concurrent"] == 0
+    assert total == 2
+    assert _status(first) == WebhookEventStatus.PROCESSED.value
+    assert _status(late["id"]) == WebhookEventStatus.PROCESSED.value